@@ -0,0 +1,102 @@
+"""
+This autocomplete_module.py contains Autocomplete class, the search-as-you-type dropdown under an
+ID entry. Keystrokes are debounced: the lookup runs once typing pauses, not on every key.
+The matches are shown as "ID  name" in a listbox; Down/Up move through them, Return or a click
+puts the chosen ID into the entry, Escape closes the list.
+This module is imported to guimodule.py.
+"""
+import tkinter as tk
+
+DEBOUNCE_MS = 120
+MAX_SUGGESTIONS = 10
+
+
+class Autocomplete:
+    """define autocomplete class"""
+    def __init__(self, entry, suggest, on_pick=None, limit=MAX_SUGGESTIONS):
+        """Adds a dropdown to entry; suggest(text, limit) returns (ID, name) pairs and
+        on_pick(ID) is called once an ID is chosen"""
+        self.entry = entry
+        self.suggest = suggest
+        self.on_pick = on_pick
+        self.limit = limit
+        self.pending = None
+        self.matches = []
+        # the dropdown is a borderless window, so it can cover the widgets under the entry
+        self.popup = tk.Toplevel(entry)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.listbox = tk.Listbox(self.popup, height=limit, activestyle='dotbox', exportselection=False)
+        self.listbox.pack(fill='both', expand=True)
+        self.entry.bind('<KeyRelease>', self.on_key, add='+')
+        self.entry.bind('<Down>', lambda event: self.move(1))
+        self.entry.bind('<Up>', lambda event: self.move(-1))
+        self.entry.bind('<Return>', self.on_return, add='+')
+        self.entry.bind('<Escape>', lambda event: self.hide())
+        self.entry.bind('<FocusOut>', lambda event: self.entry.after(150, self.hide), add='+')
+        self.listbox.bind('<ButtonRelease-1>', lambda event: self.pick())
+
+    def on_key(self, event):
+        """restarts the debounce timer on every key that changes the text"""
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        if self.pending is not None:
+            self.entry.after_cancel(self.pending)
+        self.pending = self.entry.after(DEBOUNCE_MS, self.update)
+
+    def update(self):
+        """looks up the text of the entry and shows the matches"""
+        self.pending = None
+        text = self.entry.get().strip()
+        self.matches = self.suggest(text, self.limit) if text else []
+        if not self.matches or (len(self.matches) == 1 and self.matches[0][0] == text):
+            self.hide()
+            return
+        self.listbox.delete(0, 'end')
+        for object_id, name in self.matches:
+            self.listbox.insert('end', f"{object_id}  {name}")
+        self.listbox.configure(height=len(self.matches))
+        self.popup.geometry(f"+{self.entry.winfo_rootx()}+{self.entry.winfo_rooty() + self.entry.winfo_height()}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide(self):
+        """closes the dropdown"""
+        self.popup.withdraw()
+        self.listbox.selection_clear(0, 'end')
+
+    def shown(self):
+        """returns whether the dropdown is open"""
+        return self.popup.state() != 'withdrawn'
+
+    def move(self, step):
+        """selects the next/previous match"""
+        if not self.shown():
+            return 'break'
+        selected = self.listbox.curselection()
+        position = (selected[0] + step) if selected else (0 if step > 0 else len(self.matches) - 1)
+        position = max(0, min(position, len(self.matches) - 1))
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(position)
+        self.listbox.see(position)
+        return 'break'
+
+    def on_return(self, event):
+        """chooses the selected match; without one, Return is left to the entry"""
+        if self.shown() and self.listbox.curselection():
+            self.pick()
+            return 'break'
+        self.hide()
+
+    def pick(self):
+        """puts the selected ID into the entry"""
+        selected = self.listbox.curselection()
+        if not selected:
+            return
+        object_id = self.matches[selected[0]][0]
+        self.hide()
+        self.entry.delete(0, 'end')
+        self.entry.insert(0, object_id)
+        self.entry.icursor('end')
+        if self.on_pick is not None:
+            self.on_pick(object_id)
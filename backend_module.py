@@ -0,0 +1,87 @@
+"""
+This backend_module.py contains OrderBackend class, the storage interface every report, client and
+product reads its order figures from. AggregateCube (pandas, cube_module.py) and SQLiteBackend
+(embedded SQLite file, sqlite_module.py) implement it.
+Every query returns pandas objects indexed the same way in both backends, money in NZD.
+This module is imported to cube_module.py and sqlite_module.py.
+"""
+import threading
+from cache_module import LRUCache
+
+# limits of the cache of per client/product chart data
+CHART_CACHE_ENTRIES = 512
+CHART_CACHE_BYTES = 64 * 2 ** 20
+
+
+class OrderBackend:
+    """define order backend class"""
+    DIMENSIONS = ['Year', 'Month', 'Client ID', 'Product ID', 'Category', 'Province']
+    MEASURES = ['Total', 'Quantity']
+
+    def __init__(self):
+        """Sets up what every backend shares: the data version and the chart data cache"""
+        # order store for exact date ranges (only when the order data is in memory)
+        self.store = None
+        # version goes up every time new orders are appended
+        self.version = 0
+        # chart data of clients/products, keyed by (kind, ID, chart, ..., version)
+        self.chart_cache = LRUCache(CHART_CACHE_ENTRIES, CHART_CACHE_BYTES)
+        # queries run on background threads while new orders may be appended
+        self.lock = threading.RLock()
+
+    def cached(self, key, compute):
+        """returns chart data from the chart cache for the current version, computing it when missing"""
+        return self.chart_cache.get_or_compute(key + (self.version,), compute)
+
+    def changed(self):
+        """marks that new orders were added: a new version, and older chart data forgotten"""
+        with self.lock:
+            self.version += 1
+            self.chart_cache.clear()
+
+    def consolidate(self):
+        """finishes pending work before the backend is shared (nothing to do by default)"""
+
+    # ========== queries every backend answers ==========
+
+    def total(self, measure='Total'):
+        """returns the grand total of a measure"""
+        raise NotImplementedError
+
+    def rollup(self, *dimensions, measure='Total'):
+        """returns the measure summed over the given dimensions, indexed by them (sorted)"""
+        raise NotImplementedError
+
+    def slice(self, dimension, value, *by, measure='Total'):
+        """returns the measure of one dimension value, summed by other dimensions"""
+        raise NotImplementedError
+
+    def years(self):
+        """returns the years found in the order data"""
+        raise NotImplementedError
+
+    def latest_year(self):
+        """returns the last year of the order data"""
+        years = self.years()
+        return years[-1] if years else None
+
+    def monthly(self, dimension=None, value=None, measure='Total', year=None):
+        """returns the measure in each of the 12 months of a year (the latest year by default)"""
+        raise NotImplementedError
+
+    def between(self, start, end, dimension=None, value=None, measure='Total'):
+        """returns the measure in each month from start to end date, indexed by pd.Period"""
+        raise NotImplementedError
+
+    def totals(self, column, ids, measure='Total'):
+        """returns the measure of some client/product IDs (0 for IDs without orders)"""
+        return self.rollup(column, measure=measure).reindex(list(ids), fill_value=0)
+
+    def top(self, column, measure, k, filters=(), months=None):
+        """returns the k biggest sums of a measure by column, highest first.
+        filters: (column, value) pairs the orders must match; months: (first, last) month range"""
+        raise NotImplementedError
+
+    def add_orders(self, new_orders, categories, provinces):
+        """adds a batch of new orders (order schema)"""
+        raise NotImplementedError
@@ -0,0 +1,198 @@
+"""
+Synthetic data generator: writes client_data.csv, product_data.csv, order_data.csv and
+monthly_target.csv in the same layout as the files shipped with the project, at any scale.
+Clients are spread over provinces, a few clients and products get most of the orders,
+and sales follow the seasons of the real order data.
+Orders are written in chunks, so 50 million orders never sit in memory at once.
+
+Usage (from the project folder): python benchmarks/generate.py --orders 1m [--years 1] [--folder benchmarks/data/1m]
+                                                           [--shards]
+--shards also splits the orders into one file per province in <folder>/shards (main.py --shards).
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+PROVINCES = [('NT', 'Ninh Thuan'), ('KH', 'Khanh Hoa'), ('BT', 'Binh Thuan'), ('LD', 'Lam Dong')]
+CATEGORIES = [('FOL', 'foliar fertilizer', 0.75), ('NPK', 'NPK', 0.2), ('ORG', 'Organic', 0.05)]
+UNITS = ['bag', 'bucket', 'carton', 'bottle']
+# share of the yearly revenue in each month, taken from the shipped order data
+SEASON = np.array([15.2, 6.0, 9.3, 5.2, 10.1, 8.0, 6.4, 4.8, 5.2, 9.6, 6.0, 14.4])
+FIRST_YEAR = 2019
+CHUNK_ROWS = 1000000
+
+
+def parse_scale(text):
+    """reads a number of orders such as 10000, 10k, 1.5m or 50m"""
+    text = str(text).strip().lower()
+    multiplier = {'k': 10 ** 3, 'm': 10 ** 6}.get(text[-1:], 1)
+    if text[-1:] in 'km':
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+def scale_name(orders):
+    """returns the short name of a number of orders: 10000 -> '10k'"""
+    for suffix, size in [('m', 10 ** 6), ('k', 10 ** 3)]:
+        if orders >= size and orders % size == 0:
+            return f"{orders // size}{suffix}"
+    return str(orders)
+
+
+def entity_counts(orders):
+    """returns (clients, products) for a number of orders, about the ratio of the shipped data"""
+    clients = max(74, min(orders // 20, 1000000))
+    products = max(232, min(orders // 200, 20000))
+    return clients, products
+
+
+def popularity(random, size):
+    """returns order probabilities of size entities: a few entities get most of the orders"""
+    weights = random.pareto(1.2, size) + 0.05
+    return weights / weights.sum()
+
+
+def write_clients(folder, random, size):
+    """writes client_data.csv and returns the client IDs"""
+    province_index = random.choice(len(PROVINCES), size, p=[0.5, 0.3, 0.12, 0.08])
+    ids, provinces = [], []
+    counters = [0] * len(PROVINCES)
+    for index in province_index:
+        counters[index] += 1
+        prefix, province = PROVINCES[index]
+        ids.append(f"{prefix}{counters[index]:03d}")
+        provinces.append(province)
+    clients = pd.DataFrame({
+        'Client ID': ids,
+        'Store name': [f"Dai ly {client_id}" for client_id in ids],
+        'Owner': [f"owner {client_id.lower()}" for client_id in ids],
+        'Phone number': ['0' + str(number) for number in random.integers(10 ** 8, 10 ** 9, size)],
+        'email': [f"{client_id.lower()}@example.com" for client_id in ids],
+        'province': provinces,
+    })
+    clients.to_csv(os.path.join(folder, 'client_data.csv'), index=False)
+    return np.array(ids)
+
+
+def write_products(folder, random, size):
+    """writes product_data.csv and returns (product IDs, prices)"""
+    category_index = random.choice(len(CATEGORIES), size, p=[share for _, _, share in CATEGORIES])
+    ids, categories = [], []
+    counters = [0] * len(CATEGORIES)
+    for index in category_index:
+        counters[index] += 1
+        prefix, category, _ = CATEGORIES[index]
+        ids.append(f"{prefix}{counters[index]:03d}")
+        categories.append(category)
+    prices = np.round(random.uniform(20, 400, size), 2)
+    products = pd.DataFrame({
+        'Product ID': ids,
+        'Category': categories,
+        'Product Name': [f"product {product_id.lower()}" for product_id in ids],
+        'Specification': [f"{number}kg" for number in random.choice([1, 5, 20, 25, 50], size)],
+        'Unit': random.choice(UNITS, size),
+        'Price (NZD)': [f"{price:.2f}" for price in prices],
+    })
+    products.to_csv(os.path.join(folder, 'product_data.csv'), index=False)
+    return np.array(ids), prices
+
+
+def write_targets(folder, yearly_revenue, years):
+    """writes monthly_target.csv: a target per month (and per year when there are several years)"""
+    targets = []
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        growth = 1.05 ** (year - FIRST_YEAR)
+        for month, share in enumerate(SEASON / SEASON.sum(), start=1):
+            row = {'Month': month, 'Target': round(yearly_revenue * share * growth * 1.1, 2)}
+            if years > 1:
+                row = {'Year': year, **row}
+            targets.append(row)
+    pd.DataFrame(targets).to_csv(os.path.join(folder, 'monthly_target.csv'), index=False)
+
+
+def order_days(years):
+    """returns every day of the years as 'dd/mm/yyyy' text and the probability of an order on that day"""
+    days = pd.date_range(f'{FIRST_YEAR}-01-01', f'{FIRST_YEAR + years - 1}-12-31', freq='D')
+    weights = SEASON[days.month - 1] / np.asarray(days.days_in_month)
+    return np.array(days.strftime('%d/%m/%Y')), weights / weights.sum()
+
+
+def write_orders(folder, random, orders, years, client_ids, product_ids, prices):
+    """writes order_data.csv chunk by chunk and returns the revenue of one year"""
+    client_chances = popularity(random, len(client_ids))
+    product_chances = popularity(random, len(product_ids))
+    day_text, day_chances = order_days(years)
+    revenue = 0
+    path = os.path.join(folder, 'order_data.csv')
+    with open(path, 'w', newline='') as file:
+        file.write('ORDER ID,Client ID,Product ID,Date,Price,Quantity,Total,\n')
+        for first in range(0, orders, CHUNK_ROWS):
+            rows = min(CHUNK_ROWS, orders - first)
+            products = random.choice(len(product_ids), rows, p=product_chances)
+            price = prices[products]
+            quantity = random.geometric(0.15, rows).astype('float64')
+            # a few orders are for half a unit, like in the shipped data
+            quantity[random.random(rows) < 0.01] = 0.5
+            total = np.rint(price * quantity).astype('int64')
+            revenue += int(total.sum())
+            chunk = pd.DataFrame({
+                'ORDER ID': np.arange(first + 1, first + rows + 1),
+                'Client ID': client_ids[random.choice(len(client_ids), rows, p=client_chances)],
+                'Product ID': product_ids[products],
+                'Date': day_text[random.choice(len(day_text), rows, p=day_chances)],
+                'Price': np.char.mod('%.2f', price),
+                'Quantity': np.where(quantity == 0.5, '0.5', quantity.astype('int64').astype(str)),
+                'Total': total,
+                '': '',
+            })
+            chunk.to_csv(file, header=False, index=False)
+    return revenue / years
+
+
+def write_shards(folder):
+    """splits order_data.csv of folder into one order file per province in folder/shards"""
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from shard_module import split_orders
+    return split_orders(os.path.join(folder, 'order_data.csv'), os.path.join(folder, 'client_data.csv'),
+                        os.path.join(folder, 'shards'))
+
+
+def generate(folder, orders, years=1, seed=0):
+    """writes the four csv files for a number of orders into folder"""
+    os.makedirs(folder, exist_ok=True)
+    random = np.random.default_rng(seed)
+    clients, products = entity_counts(orders)
+    client_ids = write_clients(folder, random, clients)
+    product_ids, prices = write_products(folder, random, products)
+    yearly_revenue = write_orders(folder, random, orders, years, client_ids, product_ids, prices)
+    write_targets(folder, yearly_revenue, years)
+    return clients, products
+
+
+def main():
+    """main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', default='10k', help='number of orders, e.g. 10k, 1m, 50m')
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--folder', default=None, help='default: benchmarks/data/<orders>')
+    parser.add_argument('--shards', action='store_true', help='also write the orders of each province apart')
+    options = parser.parse_args()
+
+    orders = parse_scale(options.orders)
+    folder = options.folder or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                            scale_name(orders))
+    start = time.perf_counter()
+    clients, products = generate(folder, orders, options.years, options.seed)
+    print(f"{orders} orders, {clients} clients, {products} products written to {folder} "
+          f"in {time.perf_counter() - start:.1f} s")
+    if options.shards:
+        print(f"{len(write_shards(folder))} province shards written to {os.path.join(folder, 'shards')}")
+
+
+if __name__ == '__main__':
+    main()
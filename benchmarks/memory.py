@@ -0,0 +1,106 @@
+"""
+Memory benchmark: compares the old dict-backed client objects, each holding its own orders
+DataFrame, with the __slots__ Client objects that only keep a reference to the shared, sorted
+order partition. Memory is measured with tracemalloc on synthetic clients and orders.
+
+Usage (from the project folder): python benchmarks/memory.py [--entities 100000] [--orders-per-entity 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client_module import Client
+from order_module import OrderPartition
+
+
+class DictClient:
+    """the client object before __slots__: a __dict__ and a DataFrame of its own orders"""
+    def __init__(self, client_id, name, phone, province):
+        self.id = client_id
+        self.name = name
+        self.phone = phone
+        self.province = province
+        self.orders = []
+        self.total = 0
+
+
+def synthetic_orders(entities, orders_per_entity, seed=0):
+    """returns random orders in the order schema spread over the given number of clients"""
+    random = np.random.default_rng(seed)
+    rows = entities * orders_per_entity
+    client_ids = np.array([f"C{number:06d}" for number in range(entities)])
+    quantity = random.integers(1, 20, rows)
+    price = random.integers(1000, 20000, rows)
+    return pd.DataFrame({
+        'ORDER ID': np.arange(rows, dtype='uint32'),
+        'Client ID': pd.Categorical(client_ids[random.integers(0, entities, rows)], categories=client_ids),
+        'Product ID': pd.Categorical(random.choice(['NPK001', 'FOL001', 'ORG001'], rows)),
+        'Date': pd.Timestamp('2019-01-01') + pd.to_timedelta(random.integers(0, 365, rows), unit='D'),
+        'Price': price,
+        'Quantity': quantity,
+        'Total': price * quantity,
+    }), client_ids
+
+
+def dict_clients(order_data, client_ids):
+    """builds clients the old way: every client copies its orders out of the order data"""
+    clients = {client_id: DictClient(client_id, f"Store {client_id}", '0123456789', 'Khanh Hoa')
+               for client_id in client_ids}
+    for client_id, rows in order_data.groupby('Client ID', observed=True):
+        client = clients[client_id]
+        client.orders = rows
+        client.total = rows['Total'].sum() / 100
+    return list(clients.values())
+
+
+def slot_clients(order_data, client_ids):
+    """builds clients the new way: __slots__ objects and one shared order partition"""
+    partition = OrderPartition(order_data, 'Client ID')
+    clients = [Client(client_id, f"Store {client_id}", '0123456789', 'Khanh Hoa') for client_id in client_ids]
+    for client in clients:
+        client.add_order(partition)
+        client.total_overturn()
+    return clients
+
+
+def measure(build, order_data, client_ids):
+    """returns (seconds, MB kept after the build, MB peak during the build) and the built clients"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    clients = build(order_data, client_ids)
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (seconds, current / 2 ** 20, peak / 2 ** 20), clients
+
+
+def main():
+    """main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entities', type=int, default=100000)
+    parser.add_argument('--orders-per-entity', type=int, default=5)
+    options = parser.parse_args()
+
+    order_data, client_ids = synthetic_orders(options.entities, options.orders_per_entity)
+    print(f"{options.entities} clients, {len(order_data)} orders "
+          f"({order_data.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB of order data)")
+    print(f"{'layout':<20}{'build s':>10}{'kept MB':>10}{'peak MB':>10}{'bytes/object':>14}")
+    for name, build in [('dict + DataFrames', dict_clients), ('__slots__ + ranges', slot_clients)]:
+        (seconds, kept, peak), clients = measure(build, order_data, client_ids)
+        object_size = sys.getsizeof(clients[0])
+        if hasattr(clients[0], '__dict__'):
+            object_size += sys.getsizeof(clients[0].__dict__)
+        print(f"{name:<20}{seconds:>10.2f}{kept:>10.1f}{peak:>10.1f}{object_size:>14}")
+        del clients
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Backend parity check: loads the same csv files into the in-memory (pandas) backend and the SQLite
+backend, asks both every query the reports, clients and products use, and compares the answers.
+The same batch of new orders is then appended to both reports and every query asked again, and
+the database is reopened to check the appended orders are gone like they are from memory.
+Query times of both backends are printed side by side.
+
+Usage (from the project folder):
+    python benchmarks/parity.py                      # the csv files of the project folder
+    python benchmarks/parity.py --scale 1m           # synthetic data of benchmarks/generate.py
+Exits with 1 when an answer differs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PROJECT = os.path.dirname(BENCHMARKS)
+DATA = os.path.join(BENCHMARKS, 'data')
+# answers closer than this (NZD or units) are equal: sums of cents in another order
+TOLERANCE = 0.01
+# orders of the batch appended to both backends
+APPENDED = 200
+
+
+def same(memory, sqlite):
+    """returns whether two answers (numbers or series) are equal"""
+    import numpy as np
+    import pandas as pd
+    if isinstance(memory, pd.Series):
+        if len(memory) != len(sqlite):
+            return False
+        if not memory.index.equals(sqlite.index):
+            # ties may be ranked in another order: the same values are enough
+            return np.allclose(np.sort(memory.to_numpy(dtype='float64')),
+                               np.sort(sqlite.to_numpy(dtype='float64')), atol=TOLERANCE)
+        return np.allclose(memory.to_numpy(dtype='float64'), sqlite.to_numpy(dtype='float64'), atol=TOLERANCE)
+    return abs(float(memory) - float(sqlite)) <= TOLERANCE
+
+
+def queries(report, clients, products):
+    """returns name -> function(backend) of every query to compare"""
+    from topk_module import top_k
+    years = report.cube.years()
+    first = f"{years[0]}-01-15"
+    last = f"{years[-1]}-11-20"
+    category = report.cube.rollup('Category').index[0]
+    province = report.cube.rollup('Province').index[0]
+    checks = {
+        'total': lambda backend: backend.total(),
+        'total quantity': lambda backend: backend.total('Quantity'),
+        'years': lambda backend: sum(backend.years()),
+        'rollup category': lambda backend: backend.rollup('Category'),
+        'rollup province': lambda backend: backend.rollup('Province'),
+        'rollup client': lambda backend: backend.rollup('Client ID'),
+        'rollup product quantity': lambda backend: backend.rollup('Product ID', measure='Quantity'),
+        'rollup year month': lambda backend: backend.rollup('Year', 'Month'),
+        'between': lambda backend: backend.between(first, last),
+        'between category': lambda backend: backend.between(first, last, 'Category', category),
+        'between province': lambda backend: backend.between(first, last, 'Province', province),
+        'top clients': lambda backend: top_k(backend, 'client', 'revenue', 10, year=years[-1]),
+        'top products': lambda backend: top_k(backend, 'product', 'revenue', 10, year=years[-1]),
+        'top categories of a quarter': lambda backend: top_k(backend, 'category', 'quantity', 3, months=(1, 3)),
+    }
+    for year in years:
+        checks[f"monthly {year}"] = lambda backend, year=year: backend.monthly(year=year)
+    for client_id in clients:
+        checks[f"client {client_id} monthly"] = lambda backend, client_id=client_id: backend.monthly(
+            'Client ID', client_id)
+        checks[f"client {client_id} between"] = lambda backend, client_id=client_id: backend.between(
+            first, last, 'Client ID', client_id)
+        checks[f"client {client_id} top 5"] = lambda backend, client_id=client_id: top_k(
+            backend, 'product', 'quantity', 5, client=client_id)
+    for product_id in products:
+        checks[f"product {product_id} monthly"] = lambda backend, product_id=product_id: backend.monthly(
+            'Product ID', product_id)
+        checks[f"product {product_id} top 5"] = lambda backend, product_id=product_id: top_k(
+            backend, 'client', 'quantity', 5, product=product_id)
+    return checks
+
+
+def compare(checks, memory_backend, sqlite_backend, prefix=''):
+    """asks both backends every query, prints their times, returns the number of differences"""
+    differences = 0
+    for name, function in checks.items():
+        memory, memory_ms = timed_call(function, memory_backend)
+        sqlite, sqlite_ms = timed_call(function, sqlite_backend)
+        equal = same(memory, sqlite)
+        differences += not equal
+        print(f"{prefix + name:<40}{memory_ms:>11.2f}{sqlite_ms:>11.2f}" + ('' if equal else '  DIFFERENT'))
+        if not equal:
+            print(f"  memory:\n{memory}\n  sqlite:\n{sqlite}")
+    return differences
+
+
+def new_orders(report, count=APPENDED):
+    """returns a batch of new orders: copies of the last orders with new order IDs"""
+    batch = report.orders.tail(count).copy()
+    batch['ORDER ID'] = batch['ORDER ID'].astype('int64') + int(report.orders['ORDER ID'].astype('int64').max()) + 1
+    return batch.reset_index(drop=True)
+
+
+def timed_call(function, backend):
+    """returns the answer of a query and its time in ms"""
+    start = time.perf_counter()
+    answer = function(backend)
+    return answer, (time.perf_counter() - start) * 1000
+
+
+def main():
+    """main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', default=None, help='number of orders of synthetic data, e.g. 10k, 1m')
+    parser.add_argument('--years', type=int, default=2, help='years of orders in generated data')
+    parser.add_argument('--entities', type=int, default=5, help='clients and products compared')
+    options = parser.parse_args()
+
+    folder = PROJECT
+    if options.scale:
+        sys.path.insert(0, BENCHMARKS)
+        from generate import generate, parse_scale, scale_name
+        orders = parse_scale(options.scale)
+        folder = os.path.join(DATA, scale_name(orders))
+        if not os.path.exists(os.path.join(folder, 'order_data.csv')):
+            print(f"generating {scale_name(orders)} orders in {folder}")
+            generate(folder, orders, options.years)
+    sys.path.insert(0, PROJECT)
+    os.chdir(folder)
+    import loader_module as application
+    from report_module import Report
+    from sqlite_module import import_csv, open_database, SQLiteBackend
+
+    clients = application.read_client('client_data.csv')
+    products = application.read_product('product_data.csv')
+    target = application.read_file('monthly_target.csv')
+    report = application.load_report(clients, products, target)
+    with tempfile.TemporaryDirectory() as temporary:
+        database = os.path.join(temporary, 'orders.sqlite')
+        start = time.perf_counter()
+        count = import_csv(database, *application.SOURCES)
+        print(f"{count} orders imported in {time.perf_counter() - start:.2f} s")
+        backend = SQLiteBackend(database)
+        client_ids = report.top_10_clients().index[:options.entities].tolist()
+        product_ids = report.top_10_products().index[:options.entities].tolist()
+        checks = queries(report, client_ids, product_ids)
+        print(f"{'query':<40}{'memory ms':>11}{'sqlite ms':>11}")
+        differences = compare(checks, report.cube, backend)
+        loaded_total = report.cube.total()
+
+        # the same batch appended to both reports, then every query again
+        batch = new_orders(report)
+        sqlite_report = Report(None, products, clients, target, cube=backend)
+        start = time.perf_counter()
+        sqlite_report.append_orders(batch)
+        sqlite_ms = (time.perf_counter() - start) * 1000
+        memory_totals = {client.id: client.total for client in clients}
+        start = time.perf_counter()
+        report.append_orders(batch)
+        memory_ms = (time.perf_counter() - start) * 1000
+        print(f"{f'append {len(batch)} orders':<40}{memory_ms:>11.2f}{sqlite_ms:>11.2f}")
+        changed = batch['Client ID'].unique().tolist()
+        wrong = [client_id for client_id in changed
+                 if not same(memory_totals[client_id], report.clients.get(client_id).total)]
+        if wrong:
+            print(f"  client totals after the sqlite append differ: {wrong}")
+        differences += len(wrong) + compare(checks, report.cube, backend, 'appended: ')
+        backend.close()
+
+        # appended orders last for the session: a reopened database has the csv orders only
+        reopened = open_database(database, *application.SOURCES)
+        equal = same(loaded_total, reopened.total())
+        differences += not equal
+        print(f"{'reopened total':<40}{loaded_total:>22,.2f}" + ('' if equal else '  DIFFERENT'))
+        reopened.close()
+    print(f"\n{differences} difference(s)")
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
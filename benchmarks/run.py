@@ -0,0 +1,344 @@
+"""
+Benchmark runner: times the loading paths, every Report method and every GUI handler on the
+synthetic data of benchmarks/generate.py, and compares the results with a stored baseline.
+Every case runs in its own python process, so its peak RSS is not hidden by the cases before it.
+GUI handlers need a display (or Xvfb) and are skipped without one.
+
+Usage (from the project folder):
+    python benchmarks/run.py --scale 10k --scale 1m            # generate missing data and run
+    python benchmarks/run.py --scale 1m --save-baseline        # store the results as the baseline
+    python benchmarks/run.py --scale 1m --case report.         # only cases starting with report.
+Exits with 1 when a case is slower or bigger than the baseline by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PROJECT = os.path.dirname(BENCHMARKS)
+DATA = os.path.join(BENCHMARKS, 'data')
+BASELINE = os.path.join(BENCHMARKS, 'baseline.json')
+# differences below these are noise, not regressions
+MIN_SECONDS = 0.005
+MIN_MB = 5.0
+
+
+class Options:
+    """command line options of main.py"""
+    stream = False
+    chunksize = None
+    backend = 'memory'
+    database = None
+    shards = None
+    shard_workers = None
+
+
+def peak_rss_mb():
+    """returns the peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+# ========== setups: what a case needs before it is timed ==========
+
+def setup_files():
+    """nothing loaded, only the project and the data libraries imported"""
+    import loader_module
+    import cache_module
+    import schema_module
+    return {'loader': loader_module}
+
+
+def setup_lists():
+    """client/product objects and targets loaded"""
+    context = setup_files()
+    loader = context['loader']
+    context['clients'] = loader.read_client('client_data.csv')
+    context['products'] = loader.read_product('product_data.csv')
+    context['target'] = loader.read_file('monthly_target.csv')
+    return context
+
+
+def setup_shards():
+    """client/product objects and targets loaded, orders split into one file per province"""
+    context = setup_lists()
+    if not os.path.exists('shards'):
+        sys.path.insert(0, BENCHMARKS)
+        from generate import write_shards
+        write_shards('.')
+    return context
+
+
+def setup_report():
+    """report loaded like main() does, with a chart drawing off screen"""
+    context = setup_lists()
+    loader = context['loader']
+    context['report'] = loader.load_report(context['clients'], context['products'], context['target'])
+    context['chart'] = offscreen_chart()
+    context['client'] = context['report'].top_10_clients().index[0]
+    context['product'] = context['report'].top_10_products().index[0]
+    return context
+
+
+def setup_search():
+    """report loaded with the search indexes built, as the GUI builds them in the background"""
+    context = setup_report()
+    context['report'].clients.prefix_index()
+    context['report'].products.prefix_index()
+    return context
+
+
+def setup_unassigned():
+    """report created but the orders not yet given to clients/products"""
+    context = setup_lists()
+    from report_module import Report
+    order_data = context['loader'].read_orders('order_data.csv')
+    context['report'] = Report(order_data, context['products'], context['clients'], context['target'],
+                               sources=context['loader'].SOURCES)
+    return context
+
+
+def setup_gui():
+    """report loaded and attached to the GUI, or None without a display"""
+    import tkinter as tk
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        return None
+    try:
+        window = tk.Tk()
+    except tk.TclError:
+        return None
+    context = setup_search()
+    from guimodule import SalesManagementGui
+    context['window'] = window
+    context['gui'] = SalesManagementGui(window, context['report'])
+    window.update()
+    return context
+
+
+def offscreen_chart():
+    """returns a chart drawing into a matplotlib figure that is never shown"""
+    from chart_module import FileChart
+
+    class OffscreenChart(FileChart):
+        """file chart rendered on every plot, like a canvas on screen"""
+        def draw(self):
+            """renders the figure"""
+            self.canvas.draw()
+
+    return OffscreenChart()
+
+
+def run_handler(context, handler, **entries):
+    """fills in GUI entries, calls a handler and waits until its background job has been drawn"""
+    gui, window = context['gui'], context['window']
+    for name, value in entries.items():
+        entry = getattr(gui, name)
+        entry.delete(0, 'end')
+        entry.insert(0, value)
+    handler()
+    window.update()
+    while gui.runner.running:
+        time.sleep(0.001)
+        window.update()
+    window.update()
+
+
+def report_option(context, option):
+    """selects a report radio button and presses PLOT"""
+    context['gui'].storage_variable.set(option)
+    run_handler(context, context['gui'].plot_annual_report)
+
+
+# ========== cases: name -> (setup, timed function) ==========
+
+CASES = {
+    'load.read_client': (setup_files, lambda c: c['loader'].read_client('client_data.csv')),
+    'load.read_product': (setup_files, lambda c: c['loader'].read_product('product_data.csv')),
+    'load.read_orders': (setup_files, lambda c: c['loader'].read_orders('order_data.csv')),
+    'load.assign_orders': (setup_unassigned, lambda c: c['report'].assign_orders()),
+    'load.load_data': (setup_files, lambda c: c['loader'].load_data(Options())),
+    'load.stream_report': (setup_lists, lambda c: c['loader'].stream_report(c['clients'], c['products'],
+                                                                          c['target'], None)),
+    'load.shard_report': (setup_shards, lambda c: c['loader'].shard_report(c['clients'], c['products'],
+                                                                        c['target'], ['shards'], None, None)),
+    'load.sqlite_report': (setup_lists, lambda c: c['loader'].sqlite_report(c['clients'], c['products'],
+                                                                          c['target'], None, None)),
+    'report.category_revenue': (setup_report, lambda c: c['report'].category_revenue()),
+    'report.province_revenue': (setup_report, lambda c: c['report'].province_revenue()),
+    'report.monthly_revenue': (setup_report, lambda c: c['report'].monthly_revenue()),
+    'report.year_over_year': (setup_report, lambda c: c['report'].year_over_year()),
+    'report.forecast_clients': (setup_report, lambda c: c['report'].forecast('client', known=6)),
+    'report.forecast_table': (setup_report, lambda c: c['report'].forecast_table('product', known=6)),
+    'report.top_10_clients': (setup_report, lambda c: c['report'].top_10_clients()),
+    'report.top_10_products': (setup_report, lambda c: c['report'].top_10_products()),
+    'report.diamond_clients': (setup_report, lambda c: c['report'].print_diamond_clients(30000)),
+    'report.diamond_table_sort': (setup_report, lambda c: c['report'].diamond_table(0).sort('Total Revenue').rows(0, 20)),
+    'report.plot_category_revenue': (setup_report, lambda c: c['report'].plot_category_revenue(chart=c['chart'])),
+    'report.plot_province_revenue': (setup_report, lambda c: c['report'].plot_province_revenue(chart=c['chart'])),
+    'report.plot_monthly_revenue': (setup_report, lambda c: c['report'].plot_monthly_revenue(chart=c['chart'])),
+    'report.plot_year_over_year': (setup_report, lambda c: c['report'].plot_year_over_year(chart=c['chart'])),
+    'report.plot_forecast': (setup_report, lambda c: c['report'].plot_forecast(chart=c['chart'], known=6)),
+    'report.plot_top_10_clients': (setup_report, lambda c: c['report'].plot_top_10_clients(chart=c['chart'])),
+    'report.plot_top_10_products': (setup_report, lambda c: c['report'].plot_top_10_Products(chart=c['chart'])),
+    'entity.client_details': (setup_report, lambda c: str(c['report'].clients.get(c['client']).client_details())),
+    'entity.client_top_5': (setup_report, lambda c: c['report'].clients.get(c['client']).plot_top_5_products(
+        c['report'].cube, chart=c['chart'])),
+    'entity.client_monthly': (setup_report, lambda c: c['report'].clients.get(c['client']).plot_monthly_total(
+        c['report'].cube, chart=c['chart'])),
+    'entity.product_top_5': (setup_report, lambda c: c['report'].products.get(c['product']).plot_top_5_clients(
+        c['report'].cube, chart=c['chart'])),
+    'entity.product_monthly': (setup_report, lambda c: c['report'].products.get(c['product']).plot_monthly_total(
+        c['report'].cube, chart=c['chart'])),
+    'entity.co_purchase': (setup_report, lambda c: c['report'].co_purchase()),
+    'entity.co_purchase_append': (setup_report, lambda c: c['report'].co_purchase().add_orders(
+        c['report'].orders.tail(10))),
+    'entity.similar_products': (setup_report, lambda c: c['report'].similar_products_table(c['product'])),
+    'entity.suggested_products': (setup_report, lambda c: c['report'].suggested_products_table(c['client'])),
+    'entity.prefix_index': (setup_report, lambda c: (c['report'].clients.prefix_index(),
+                                                     c['report'].products.prefix_index())),
+    'entity.search_clients': (setup_search, lambda c: c['report'].clients.suggest(c['client'][:3])),
+    'entity.search_products': (setup_search, lambda c: c['report'].products.suggest(c['product'][:3])),
+    'gui.print_client_info': (setup_gui, lambda c: run_handler(c, c['gui'].print_client_info,
+                                                               client_entry=c['client'])),
+    'gui.plot_top5_product': (setup_gui, lambda c: run_handler(c, c['gui'].plot_top5_product,
+                                                               client_entry=c['client'])),
+    'gui.plot_client_monthly_total': (setup_gui, lambda c: run_handler(c, c['gui'].plot_client_monthly_total,
+                                                                       client_entry=c['client'])),
+    'gui.show_suggested_products': (setup_gui, lambda c: run_handler(c, c['gui'].show_suggested_products,
+                                                                     client_entry=c['client'])),
+    'gui.suggest_clients': (setup_gui, lambda c: c['gui'].suggest_clients(c['client'][:3], 10)),
+    'gui.suggest_products': (setup_gui, lambda c: c['gui'].suggest_products(c['product'][:3], 10)),
+    'gui.print_product_info': (setup_gui, lambda c: run_handler(c, c['gui'].print_product_info,
+                                                                product_entry=c['product'])),
+    'gui.plot_top5_clients': (setup_gui, lambda c: run_handler(c, c['gui'].plot_top5_clients,
+                                                               product_entry=c['product'])),
+    'gui.plot_product_monthly_total': (setup_gui, lambda c: run_handler(c, c['gui'].plot_product_monthly_total,
+                                                                        product_entry=c['product'])),
+    'gui.similar_products': (setup_gui, lambda c: run_handler(c, c['gui'].similar_products,
+                                                              product_entry=c['product'])),
+    'gui.report_category': (setup_gui, lambda c: report_option(c, 'category')),
+    'gui.report_province': (setup_gui, lambda c: report_option(c, 'province')),
+    'gui.report_month': (setup_gui, lambda c: report_option(c, 'month')),
+    'gui.report_year': (setup_gui, lambda c: report_option(c, 'year')),
+    'gui.report_forecast': (setup_gui, lambda c: report_option(c, 'forecast')),
+    'gui.report_product10': (setup_gui, lambda c: report_option(c, 'product10')),
+    'gui.report_client10': (setup_gui, lambda c: report_option(c, 'client10')),
+    'gui.print_vip_client': (setup_gui, lambda c: run_handler(c, c['gui'].print_vip_client,
+                                                              threshold_entry='30000')),
+}
+
+
+def run_case(name, repeat):
+    """runs one case in this process and returns its measurements"""
+    import matplotlib
+    matplotlib.use('Agg' if not name.startswith('gui.') else 'TkAgg')
+    setup, work = CASES[name]
+    context = setup()
+    if context is None:
+        return {'skipped': 'no display'}
+    setup_mb = peak_rss_mb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work(context)
+        times.append(time.perf_counter() - start)
+    if 'window' in context:
+        context['gui'].close()
+    return {'first': times[0], 'seconds': min(times), 'setup_mb': setup_mb, 'peak_mb': peak_rss_mb()}
+
+
+def run_child(name, folder, repeat, cold):
+    """runs one case in a new python process inside the data folder"""
+    if cold:
+        shutil.rmtree(os.path.join(folder, '.sales_cache'), ignore_errors=True)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name,
+                             '--repeat', str(repeat)],
+                            cwd=folder, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def regressions(result, baseline, tolerance):
+    """returns what got worse than the baseline by more than the tolerance"""
+    found = []
+    if not baseline or 'seconds' not in result or 'seconds' not in baseline:
+        return found
+    if result['seconds'] > baseline['seconds'] * (1 + tolerance) + MIN_SECONDS:
+        found.append(f"time {baseline['seconds']:.3f}s -> {result['seconds']:.3f}s")
+    if result['peak_mb'] > baseline['peak_mb'] * (1 + tolerance) + MIN_MB:
+        found.append(f"peak RSS {baseline['peak_mb']:.0f}MB -> {result['peak_mb']:.0f}MB")
+    return found
+
+
+def main():
+    """main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', action='append', default=None,
+                        help='number of orders, e.g. 10k, 1m, 50m (can be repeated, default 10k)')
+    parser.add_argument('--years', type=int, default=1, help='years of orders in generated data')
+    parser.add_argument('--case', action='append', default=None, help='only run cases starting with this')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each case, the best one is kept')
+    parser.add_argument('--cold', action='store_true', help='remove the csv caches before every case')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        sys.path.insert(0, PROJECT)
+        print(json.dumps(run_case(options.child, options.repeat)))
+        return
+
+    sys.path.insert(0, BENCHMARKS)
+    from generate import generate, parse_scale, scale_name
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    names = [name for name in CASES
+             if not options.case or any(name.startswith(prefix) for prefix in options.case)]
+    results = {}
+    failed = False
+    for scale in options.scale or ['10k']:
+        orders = parse_scale(scale)
+        scale = scale_name(orders)
+        folder = os.path.join(DATA, scale)
+        if not os.path.exists(os.path.join(folder, 'order_data.csv')):
+            print(f"generating {scale} orders in {folder}")
+            generate(folder, orders, options.years)
+        print(f"\n{scale} orders")
+        print(f"{'case':<34}{'first s':>10}{'best s':>10}{'setup MB':>10}{'peak MB':>10}")
+        results[scale] = {}
+        for name in names:
+            result = run_child(name, folder, options.repeat, options.cold)
+            results[scale][name] = result
+            if 'skipped' in result or 'error' in result:
+                print(f"{name:<34}  {result.get('skipped') or 'error: ' + result['error']}")
+                failed = failed or 'error' in result
+                continue
+            found = regressions(result, baseline.get(scale, {}).get(name), options.tolerance)
+            failed = failed or bool(found)
+            print(f"{name:<34}{result['first']:>10.3f}{result['seconds']:>10.3f}"
+                  f"{result['setup_mb']:>10.0f}{result['peak_mb']:>10.0f}"
+                  + (f"  REGRESSION: {', '.join(found)}" if found else ''))
+    if options.save_baseline:
+        for scale, cases in results.items():
+            baseline.setdefault(scale, {}).update(
+                {name: result for name, result in cases.items() if 'seconds' in result})
+        with open(options.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nbaseline saved to {options.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
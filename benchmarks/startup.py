@@ -0,0 +1,51 @@
+"""
+Startup benchmark: measures how long `import main` takes with python -X importtime, lists the
+slowest imports and checks that the heavy libraries are not imported before the window shows up.
+
+Usage (from the project folder): python benchmarks/startup.py [--runs 5] [--max-ms 300]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'prettytable']
+
+
+def import_times(module):
+    """runs python -X importtime on a module and returns {imported module: cumulative us}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROJECT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    """main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail when the best import time is slower than this')
+    options = parser.parse_args()
+
+    runs = [import_times(options.module) for _ in range(options.runs)]
+    best = min(run[options.module] for run in runs) / 1000
+    print(f"import {options.module}: best {best:.1f} ms over {options.runs} runs")
+    print("slowest imports (cumulative ms):")
+    for name, cumulative in sorted(runs[-1].items(), key=lambda item: -item[1])[:10]:
+        print(f"  {cumulative / 1000:8.1f}  {name}")
+    heavy = [name for name in HEAVY_MODULES if name in runs[-1]]
+    print("heavy modules imported at startup:", ', '.join(heavy) if heavy else 'none')
+    if heavy or (options.max_ms is not None and best > options.max_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+This cache_module.py contains the helpers for storing computed data on disk next to the csv files.
+A cached file is reused only while the signature (modified time and size) of its csv files
+has not changed.
+Csv tables are cached in a columnar binary form: one .npy file per column, text columns stored as
+categorical codes, which are memory-mapped when the table is loaded again.
+It also contains LRUCache class, a bounded in-memory cache of computed chart data.
+This module is imported to loader_module.py, cube_module.py, backend_module.py and sqlite_module.py.
+"""
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = '.sales_cache'
+
+
+def file_signature(filenames):
+    """returns the modified time and size of each file"""
+    signature = []
+    for filename in filenames:
+        status = os.stat(filename)
+        signature.append((os.path.basename(filename), status.st_mtime_ns, status.st_size))
+    return signature
+
+
+def cache_path(source, name):
+    """returns the path of a cache file in the cache folder next to the source csv file"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(source)), CACHE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, name)
+
+
+def load_cached(path, signature):
+    """returns the cached value, or None if it is missing or its csv files have changed"""
+    if not os.path.exists(path):
+        return None
+    try:
+        cached = pd.read_pickle(path)
+    except Exception:
+        return None
+    if cached.get('signature') != signature:
+        return None
+    return cached['value']
+
+
+def save_cached(path, signature, value):
+    """stores a value together with the signature of its csv files"""
+    pd.to_pickle({'signature': signature, 'value': value}, path)
+
+
+def load_table(filename, reader=pd.read_csv, version=0):
+    """returns a csv file as a dataframe, from the columnar cache if the csv file has not changed
+    version: changes whenever the reader produces a different table from the same csv file"""
+    folder = cache_path(filename, os.path.basename(filename) + '.columns')
+    signature = file_signature([filename])
+    table = read_columns(folder, signature, version)
+    if table is None:
+        table = reader(filename)
+        table = write_columns(folder, signature, version, table)
+    return table
+
+
+def read_columns(folder, signature, version=0):
+    """loads a cached table with memory-mapped columns, or returns None if it is out of date"""
+    meta_file = os.path.join(folder, 'meta.json')
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as infile:
+        meta = json.load(infile)
+    if meta['signature'] != [list(item) for item in signature] or meta.get('version') != version:
+        return None
+    columns = {}
+    for number, (name, kind) in enumerate(meta['columns']):
+        values = np.load(os.path.join(folder, f"{number}.npy"), mmap_mode='r')
+        if kind == 'category':
+            categories = np.load(os.path.join(folder, f"{number}.categories.npy"))
+            values = pd.Categorical.from_codes(values, categories=categories.tolist())
+        columns[name] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def write_columns(folder, signature, version, table):
+    """stores a table as one binary file per column, text columns become categoricals"""
+    os.makedirs(folder, exist_ok=True)
+    meta_file = os.path.join(folder, 'meta.json')
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+    columns = []
+    for number, name in enumerate(table.columns):
+        values = table[name]
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = np.asarray(values.cat.categories.astype(str), dtype=str)
+            np.save(os.path.join(folder, f"{number}.categories.npy"), categories)
+            np.save(os.path.join(folder, f"{number}.npy"), values.cat.codes.to_numpy())
+            columns.append((name, 'category'))
+        else:
+            np.save(os.path.join(folder, f"{number}.npy"), values.to_numpy())
+            columns.append((name, 'array'))
+    # meta file is written last so a half-written cache is never read
+    with open(meta_file, 'w') as outfile:
+        json.dump({'signature': signature, 'version': version, 'columns': columns}, outfile)
+    return read_columns(folder, signature, version)
+
+
+class LRUCache:
+    """define LRU cache class"""
+    def __init__(self, max_entries=256, max_bytes=None):
+        """Creates an empty cache holding at most max_entries values (and max_bytes, when given);
+        the least recently used values are evicted first"""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_or_compute(self, key, compute):
+        """returns the value cached for key, or computes, stores and returns it"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = value_size(value)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = (value, size)
+                self.bytes += size
+                self.evict()
+        return value
+
+    def evict(self):
+        """drops the least recently used values until the cache is within its limits"""
+        while self.entries and (len(self.entries) > self.max_entries or
+                                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            key, (value, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """changes the limits of the cache that are given"""
+        with self.lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self.evict()
+
+    def clear(self):
+        """forgets every cached value (the statistics are kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """returns the hit/miss statistics and the size of the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries), 'max_entries': self.max_entries,
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+def value_size(value):
+    """returns the memory used by a cached value (deep size of pandas objects)"""
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    return sys.getsizeof(value)
@@ -0,0 +1,170 @@
+"""
+This chart_module.py contains Chart class and its three kinds: ChartPanel, a matplotlib canvas embedded
+once in the tkinter window, WindowChart, a pyplot window for using the classes without the GUI,
+and FileChart, an off-screen (Agg) figure saved to image files.
+Every chart type (key) keeps its own axes and artists; plotting the same chart type again only
+updates the bar heights / pie wedges and redraws the canvas.
+This module is imported to client_module.py, product_module.py, report_module.py, guimodule.py and export.py.
+"""
+import math
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+PIE_COLORS = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#c2c2f0', '#ffb3e6', '#c4e17f', '#76d7c4']
+
+
+def pie_colors(number):
+    """returns colors for a pie chart of number wedges"""
+    return [PIE_COLORS[index % len(PIE_COLORS)] for index in range(number)]
+
+
+def month_labels(index):
+    """returns x tick labels for months: 'Jan' for month numbers, 'Jan 2023' for pd.Period months"""
+    labels = []
+    for month in index:
+        if hasattr(month, 'year'):
+            labels.append('{} {}'.format(MONTH_LABELS[month.month - 1], month.year))
+        else:
+            labels.append(MONTH_LABELS[int(month) - 1])
+    return labels
+
+
+class Chart:
+    """define chart class"""
+    def __init__(self, figure):
+        """Creates a chart drawing on a matplotlib figure"""
+        self.figure = figure
+        # one view per chart type: its axes, kind and artists
+        self.views = {}
+
+    def view(self, key, kind, size):
+        """returns the view of a chart type (shown alone), and whether its artists can be updated"""
+        for other_key, other in self.views.items():
+            other['axes'].set_visible(other_key == key)
+        if key not in self.views:
+            axes = self.figure.add_subplot()
+            self.views[key] = {'axes': axes, 'kind': None, 'size': None, 'artists': None}
+        view = self.views[key]
+        view['axes'].set_visible(True)
+        reusable = view['kind'] == kind and view['size'] == size
+        if not reusable:
+            view['axes'].clear()
+            view['kind'] = kind
+            view['size'] = size
+        return view, reusable
+
+    def bar(self, key, xs, ys, color, title, xlabel, ylabel, xticklabels=None, rotation=0,
+            grid=True, lines=(), bar_label=None):
+        """draws a bar chart (and optional lines over it, given as (values, color, label))
+        or updates the one of the same chart type"""
+        positions = list(range(len(ys)))
+        view, reusable = self.view(key, 'bar', (len(ys), len(lines)))
+        axes = view['axes']
+        if reusable:
+            bars, line_artists = view['artists']
+            for rect, height in zip(bars, ys):
+                rect.set_height(height)
+                rect.set_color(color)
+            bars.set_label(bar_label)
+            for line_artist, (values, line_color, line_label) in zip(line_artists, lines):
+                line_artist.set_ydata(values)
+                line_artist.set_label(line_label)
+            if line_artists:
+                # the labels may hold figures (e.g. projected totals), so the legend is made again
+                axes.legend(loc='best')
+        else:
+            bars = axes.bar(positions, ys, color=color, label=bar_label)
+            line_artists = []
+            for values, line_color, line_label in lines:
+                line_artist, = axes.plot(positions, values, 'o-', color=line_color, label=line_label)
+                line_artists.append(line_artist)
+            if line_artists:
+                axes.legend(loc='best')
+            view['artists'] = (bars, line_artists)
+        highest = max([0] + list(ys) + [value for values, line_color, line_label in lines for value in values])
+        axes.set_ylim(0, highest * 1.05 or 1)
+        axes.set_xticks(positions)
+        axes.set_xticklabels(xticklabels if xticklabels is not None else [str(x) for x in xs],
+                             rotation=rotation)
+        axes.set_title(title, color='#333333')
+        axes.set_xlabel(xlabel, color='#333333')
+        axes.set_ylabel(ylabel, color='#333333')
+        axes.grid(grid)
+        self.draw()
+
+    def pie(self, key, values, labels, colors, title, autopct=None):
+        """draws a pie chart or moves the wedges of the one of the same chart type"""
+        view, reusable = self.view(key, 'pie', len(values))
+        axes = view['axes']
+        if reusable:
+            wedges, label_texts, pct_texts = view['artists']
+            total = float(sum(values)) or 1.0
+            start = 0.0
+            for number, value in enumerate(values):
+                end = start + 360.0 * value / total
+                wedges[number].set_theta1(start)
+                wedges[number].set_theta2(end)
+                middle = math.radians((start + end) / 2)
+                x, y = math.cos(middle), math.sin(middle)
+                label_texts[number].set_position((1.1 * x, 1.1 * y))
+                label_texts[number].set_text(labels[number])
+                label_texts[number].set_horizontalalignment('left' if x > 0 else 'right')
+                if pct_texts:
+                    pct_texts[number].set_position((0.6 * x, 0.6 * y))
+                    pct_texts[number].set_text(autopct(100.0 * value / total))
+                start = end
+        else:
+            drawn = list(axes.pie(values, labels=labels, colors=colors, autopct=autopct))
+            wedges, label_texts = drawn[0], drawn[1]
+            pct_texts = drawn[2] if len(drawn) > 2 else []
+            view['artists'] = (wedges, label_texts, pct_texts)
+        axes.set_title(title)
+        self.draw()
+
+    def draw(self):
+        """shows the chart"""
+        raise NotImplementedError
+
+
+class ChartPanel(Chart):
+    """define chart panel class: a canvas created once inside a tkinter widget"""
+    def __init__(self, master, width=6.4, height=4.8):
+        # matplotlib is only imported when the first canvas is created
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        super().__init__(Figure(figsize=(width, height)))
+        self.figure.subplots_adjust(bottom=0.18)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+
+    def draw(self):
+        """redraws the canvas when tkinter is idle"""
+        self.canvas.draw_idle()
+
+
+class WindowChart(Chart):
+    """define window chart class: a new pyplot window, used outside the GUI"""
+    def __init__(self):
+        import matplotlib.pyplot as plt
+        super().__init__(plt.figure())
+
+    def draw(self):
+        """shows the pyplot window"""
+        import matplotlib.pyplot as plt
+        plt.show()
+
+
+class FileChart(Chart):
+    """define file chart class: an off-screen Agg figure, rendered only when saved"""
+    def __init__(self, width=6.4, height=4.8):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        super().__init__(Figure(figsize=(width, height)))
+        self.figure.subplots_adjust(bottom=0.18)
+        self.canvas = FigureCanvasAgg(self.figure)
+
+    def draw(self):
+        """nothing to show, the figure is rendered by save"""
+
+    def save(self, filename):
+        """renders the chart into an image file (the format follows the file extension)"""
+        self.figure.savefig(filename)
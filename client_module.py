@@ -1,84 +1,95 @@
 """
 This client_module.py contains Client class, which is the blueprint for creating client object.
-This module is imported to main.py, report_module.py and guimodule.py.
+This module is imported to loader_module.py.
 """
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from prettytable import PrettyTable
+from chart_module import WindowChart, month_labels
+from instrument_module import timed
+from table_module import Table
 
 class Client:
     """define client class"""
+    # no per-object __dict__: a client is a few references, its orders stay in the shared partition
+    __slots__ = ('id', 'name', 'phone', 'province', 'order_partition', 'total')
+
     def __init__(self, client_id, name, phone, province):
         """Creates a new client with the client ID, name, phone, and province attributes"""
         self.id = client_id
         self.name = name
         self.phone = phone
         self.province = province
-        self.orders = []
+        self.order_partition = None
         self.total = 0
 
+    def details(self):
+        """returns (field, value) pairs of client's details"""
+        return [("Client's ID", self.id), ("Name", self.name), ("Phone number", self.phone),
+                ("Province", self.province), ("Total Revenue (NZD)", self.total)]
+
     def client_details(self):
         """organises and return a table of client's details"""
-        table = PrettyTable()
-        table.field_names = ["Client Details"]
-        table.add_row([f"Client's ID: {self.id}"])
-        table.add_row([f"Name: {self.name}"])
-        table.add_row([f"Phone number: {self.phone}"])
-        table.add_row([f"Province: {self.province}"])
-        table.add_row([f"Total Revenue (NZD): {self.total}"])
-        return table
+        return Table(["Client Details"], [[f"{field}: {value}"] for field, value in self.details()])
+
+    def add_order(self, client_orders):
+        """links the client object to the order partition grouped by Client ID"""
+        self.order_partition = client_orders
+
+    @property
+    def order_range(self):
+        """returns the (start, stop) rows of the client's orders in the sorted order data"""
+        if self.order_partition is None:
+            return (0, 0)
+        return self.order_partition.row_range(self.id)
 
-    def add_order(self, order_data):
-        """fetches all orders of client object from order data and returns
-        client's orders data"""
-        self.orders = order_data.loc[order_data['Client ID'] == self.id, :]
+    @property
+    def orders(self):
+        """returns all orders of the client object, read from the order partition when asked for"""
+        if self.order_partition is None:
+            return []
+        return self.order_partition.rows(self.id)
 
     def total_overturn(self):
-        """calculates total overturn of a particular client object"""
-        client_data = self.orders[self.orders['Client ID'] == self.id]
-        self.total = np.sum(client_data['Total'].values)
+        """reads total overturn of a particular client object from the order partition"""
+        self.total = self.order_partition.total(self.id)
 
-    def plot_top_5_products(self):
+    @timed()
+    def top_5_products(self, cube):
+        """returns units of the 5 products bought most by the client"""
+        from topk_module import top_k
+        return cube.cached(('client', self.id, 'top 5'),
+                           lambda: top_k(cube, 'product', 'quantity', 5, client=self.id))
+
+    @timed()
+    def monthly_total(self, cube, start=None, end=None, year=None):
+        """returns client overturn in each month of a year (the latest by default),
+        or in each month from start to end date when both are given"""
+        if start is not None and end is not None:
+            return cube.cached(('client', self.id, 'monthly', start, end),
+                               lambda: cube.between(start, end, 'Client ID', self.id))
+        return cube.cached(('client', self.id, 'monthly', year),
+                           lambda: cube.monthly('Client ID', self.id, year=year))
+
+    @timed()
+    def plot_top_5_products(self, cube, top5_data=None, chart=None):
         """Plots bar chart from client's top 5 best-selling products"""
-        client_data = self.orders[self.orders['Client ID'] == self.id]
-        # Plot Top 5 Clients buying this product:
-        top5_data = client_data[["Product ID", "Quantity"]]
-        top5_data = top5_data.groupby(['Product ID'], as_index=False).sum().sort_values(by='Quantity',
-                                                                                        ascending=False).head()
-        axes = plt.axes()
-        xs = top5_data['Product ID'].tolist()
-        ys = top5_data['Quantity'].tolist()
-        axes.bar(xs, ys, color='orange')
-        axes.set_title(f"Top 5 Best-Selling Products Of Client {self.id}")
-        axes.set_xlabel("Products")
-        axes.set_ylabel("Units")
-        axes.grid(True)
-        plt.show()
+        # Plot Top 5 Products bought by this client:
+        if top5_data is None:
+            top5_data = self.top_5_products(cube)
+        chart = chart or WindowChart()
+        xs = top5_data.index.tolist()
+        ys = top5_data.tolist()
+        chart.bar('client top 5', xs, ys, color='orange',
+                  title=f"Top 5 Best-Selling Products Of Client {self.id}",
+                  xlabel="Products", ylabel="Units")
 
-    def plot_monthly_total(self):
+    @timed()
+    def plot_monthly_total(self, cube, monthly_total=None, chart=None):
         """plots monthly total for client overturn"""
-        client_data = self.orders[self.orders['Client ID'] == self.id]
-        client_data = client_data[['Date', 'Total']]
-        client_data['Date'] = pd.to_datetime(client_data.Date)
-        monthly_total = client_data.groupby(client_data.Date.dt.month, )['Total'].sum()
-        month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        month_empty = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0, 11: 0, 12: 0}
-        month_values = monthly_total.to_dict()
-        month_dict = {**month_empty, **month_values}
-        months = list(month_dict.keys())
-        totals = list(month_dict.values())
+        if monthly_total is None:
+            monthly_total = self.monthly_total(cube)
         # plot bar chart:
-        axes = plt.axes()
-        xs = months
-        ys = totals
-        axes.bar(xs, ys, color='green')
-        axes.set_title(f"Monthly Revenues of Client {self.id}")
-        axes.set_xlabel("Month")
-        axes.set_ylabel("NZD")
-        axes.set_xticks(range(1,13))
-        axes.set_xticklabels(month_labels)
-        axes.grid(True)
-        plt.show()
-
-
+        chart = chart or WindowChart()
+        xs = monthly_total.index.tolist()
+        ys = monthly_total.tolist()
+        chart.bar('client monthly', xs, ys, color='green',
+                  title=f"Monthly Revenues of Client {self.id}",
+                  xlabel="Month", ylabel="NZD", xticklabels=month_labels(xs))
@@ -0,0 +1,283 @@
+"""
+This copurchase_module.py contains CoPurchaseMatrix class, the sparse client x product matrix of
+the quantity and revenue every client bought of every product, for cross-sell queries:
+- similar products: products bought by the same clients (cosine similarity of their columns),
+  with the number of clients buying both
+- suggested products: what the clients most similar to a client buy and that client does not
+The matrix is stored in CSR form with numpy arrays: one sorted key (client row, product column)
+per non-zero entry, the row pointers of every client, and a column order for product lookups.
+Queries gather the rows/columns they need with array operations and add them up with bincount.
+Appended orders update the entries already stored in place; the new entries wait in a small
+sorted buffer that queries read too, and are merged into the CSR arrays once the buffer is big
+enough. The row and column norms are updated by the appended values only, so an append costs
+in proportion to its batch, not to the matrix.
+This module is imported to report_module.py.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from schema_module import to_money
+
+# key of an entry: client row in the high 32 bits, product column in the low 32 bits
+COLUMN_BITS = 32
+COLUMN_MASK = (1 << COLUMN_BITS) - 1
+MEASURES = ['Quantity', 'Total']
+NEIGHBOURS = 50
+# the buffer of new entries is merged into the CSR arrays once it holds this many entries,
+# or this share of the matrix when that is more
+MERGE_ENTRIES = 4096
+MERGE_SHARE = 16
+
+
+class CoPurchaseMatrix:
+    """define co-purchase matrix class"""
+    def __init__(self, quantity, revenue):
+        """Creates the matrix from the quantity and revenue (NZD) of each (Client ID, Product ID)"""
+        self.lock = threading.RLock()
+        self.client_ids = []
+        self.product_ids = []
+        self.client_rows = {}
+        self.product_columns = {}
+        self.keys = np.zeros(0, dtype='int64')
+        self.values = {measure: np.zeros(0) for measure in MEASURES}
+        # entries added since the last merge, sorted by key
+        self.new_keys = np.zeros(0, dtype='int64')
+        self.new_values = {measure: np.zeros(0) for measure in MEASURES}
+        # sums of the squared values of every client row / product column (squared norms)
+        self.client_squares = {measure: np.zeros(0) for measure in MEASURES}
+        self.product_squares = {measure: np.zeros(0) for measure in MEASURES}
+        self.add(quantity, revenue)
+        self.merge()
+
+    @classmethod
+    def build(cls, backend):
+        """creates the matrix from the client x product sums of the order backend"""
+        quantity = backend.rollup('Client ID', 'Product ID', measure='Quantity')
+        revenue = backend.rollup('Client ID', 'Product ID', measure='Total')
+        return cls(quantity, revenue.reindex(quantity.index, fill_value=0))
+
+    def __len__(self):
+        """returns the number of non-zero entries"""
+        return len(self.keys) + len(self.new_keys)
+
+    def positions(self, ids, known, positions):
+        """returns the row/column of each ID, giving new IDs the next ones"""
+        found = []
+        for object_id in ids:
+            position = positions.get(object_id)
+            if position is None:
+                position = positions[object_id] = len(known)
+                known.append(object_id)
+            found.append(position)
+        return np.asarray(found, dtype='int64')
+
+    def add(self, quantity, revenue):
+        """adds quantities and revenues indexed by (Client ID, Product ID): entries already in the
+        matrix are updated in place, the others are inserted into the buffer of new entries"""
+        if len(quantity) == 0:
+            return
+        with self.lock:
+            rows = self.positions(quantity.index.get_level_values(0), self.client_ids, self.client_rows)
+            columns = self.positions(quantity.index.get_level_values(1), self.product_ids, self.product_columns)
+            for squares, size in [(self.client_squares, len(self.client_ids)),
+                                  (self.product_squares, len(self.product_ids))]:
+                for measure in MEASURES:
+                    if size > len(squares[measure]):
+                        squares[measure] = np.concatenate((squares[measure], np.zeros(size - len(squares[measure]))))
+            keys = (rows << COLUMN_BITS) | columns
+            added = {'Quantity': quantity.to_numpy(dtype='float64'), 'Total': revenue.to_numpy(dtype='float64')}
+            # entries found once each (the sums are grouped by client and product)
+            rest = self.update(self.keys, self.values, keys, added)
+            keys = keys[rest]
+            added = {measure: values[rest] for measure, values in added.items()}
+            rest = self.update(self.new_keys, self.new_values, keys, added)
+            order = np.argsort(keys[rest], kind='stable')
+            keys = keys[rest][order]
+            places = np.searchsorted(self.new_keys, keys)
+            for measure in MEASURES:
+                values = added[measure][rest][order]
+                self.add_squares(keys, np.zeros(len(keys)), values, measure)
+                self.new_values[measure] = np.insert(self.new_values[measure], places, values)
+            self.new_keys = np.insert(self.new_keys, places, keys)
+            if len(self.new_keys) > max(MERGE_ENTRIES, len(self.keys) // MERGE_SHARE):
+                self.merge()
+            else:
+                self.index_new()
+
+    def update(self, stored_keys, stored_values, keys, added):
+        """adds the values of the keys found in sorted stored keys to their stored values,
+        returns which keys were not found"""
+        places = np.searchsorted(stored_keys, keys)
+        found = places < len(stored_keys)
+        found[found] = stored_keys[places[found]] == keys[found]
+        places = places[found]
+        for measure in MEASURES:
+            old = stored_values[measure][places]
+            new = old + added[measure][found]
+            stored_values[measure][places] = new
+            self.add_squares(keys[found], old, new, measure)
+        return ~found
+
+    def add_squares(self, keys, old, new, measure):
+        """updates the squared norms of the rows/columns of some entries whose values changed"""
+        change = new ** 2 - old ** 2
+        np.add.at(self.client_squares[measure], keys >> COLUMN_BITS, change)
+        np.add.at(self.product_squares[measure], keys & COLUMN_MASK, change)
+
+    def add_orders(self, new_orders):
+        """adds a batch of new orders (order schema)"""
+        sums = new_orders.groupby(['Client ID', 'Product ID'], observed=True)[['Quantity', 'Total']].sum()
+        sums = sums[(sums['Quantity'] != 0) | (sums['Total'] != 0)]
+        self.add(sums['Quantity'], to_money(sums['Total']))
+
+    def merge(self):
+        """moves the new entries into the CSR arrays and recomputes the norms exactly"""
+        with self.lock:
+            keys = np.concatenate((self.keys, self.new_keys))
+            order = np.argsort(keys, kind='stable')
+            self.keys = keys[order]
+            for measure in MEASURES:
+                self.values[measure] = np.concatenate((self.values[measure], self.new_values[measure]))[order]
+                self.new_values[measure] = np.zeros(0)
+            self.new_keys = np.zeros(0, dtype='int64')
+            self.index()
+            self.index_new()
+
+    def index(self):
+        """computes the row pointers, the column order and the norms from the sorted keys"""
+        self.rows = (self.keys >> COLUMN_BITS).astype('int64')
+        self.columns = (self.keys & COLUMN_MASK).astype('int64')
+        self.row_pointers = np.concatenate(([0], np.cumsum(np.bincount(self.rows, minlength=len(self.client_ids)))))
+        self.column_order = np.argsort(self.columns, kind='stable')
+        self.column_pointers = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.columns, minlength=len(self.product_ids)))))
+        self.client_squares = {measure: np.bincount(self.rows, values ** 2, len(self.client_ids))
+                               for measure, values in self.values.items()}
+        self.product_squares = {measure: np.bincount(self.columns, values ** 2, len(self.product_ids))
+                                for measure, values in self.values.items()}
+
+    def index_new(self):
+        """computes the rows, columns and column order of the new entries"""
+        self.new_rows = self.new_keys >> COLUMN_BITS
+        self.new_columns = self.new_keys & COLUMN_MASK
+        self.new_column_order = np.argsort(self.new_columns, kind='stable')
+        self.new_sorted_columns = self.new_columns[self.new_column_order]
+
+    def client_norms(self, measure):
+        """returns the norm of every client row"""
+        return np.sqrt(np.maximum(self.client_squares[measure], 0))
+
+    def product_norms(self, measure):
+        """returns the norm of every product column"""
+        return np.sqrt(np.maximum(self.product_squares[measure], 0))
+
+    def client_entries(self, rows, measure):
+        """returns the entries of some client rows: the position in rows each one belongs to,
+        its column and its value"""
+        starts, stops = bounds(self.row_pointers, rows)
+        positions, owners = spans(starts, stops)
+        new_positions, new_owners = spans(np.searchsorted(self.new_keys, rows << COLUMN_BITS),
+                                          np.searchsorted(self.new_keys, (rows + 1) << COLUMN_BITS))
+        return (np.concatenate((owners, new_owners)),
+                np.concatenate((self.columns[positions], self.new_columns[new_positions])),
+                np.concatenate((self.values[measure][positions], self.new_values[measure][new_positions])))
+
+    def product_entries(self, columns, measure):
+        """returns the entries of some product columns: the position in columns each one belongs
+        to, its row and its value"""
+        starts, stops = bounds(self.column_pointers, columns)
+        positions, owners = spans(starts, stops)
+        positions = self.column_order[positions]
+        new_positions, new_owners = spans(np.searchsorted(self.new_sorted_columns, columns),
+                                          np.searchsorted(self.new_sorted_columns, columns, 'right'))
+        new_positions = self.new_column_order[new_positions]
+        return (np.concatenate((owners, new_owners)),
+                np.concatenate((self.rows[positions], self.new_rows[new_positions])),
+                np.concatenate((self.values[measure][positions], self.new_values[measure][new_positions])))
+
+    def similar_products(self, product_id, k=10, measure='Quantity'):
+        """returns the k products most often bought together with a product: cosine similarity of
+        their clients (weighted by the measure) and the number of clients buying both"""
+        with self.lock:
+            column = self.product_columns.get(product_id)
+            if column is None:
+                return empty(['Similarity', 'Clients'], 'Product ID')
+            _, rows, bought = self.product_entries(np.array([column]), measure)
+            owners, columns, values = self.client_entries(rows, measure)
+            scores = np.bincount(columns, values * bought[owners], len(self.product_ids))
+            together = np.bincount(columns, minlength=len(self.product_ids))
+            norms = self.product_norms(measure)
+            norms = norms * norms[column]
+            scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+            scores[column] = 0
+            chosen = largest(scores, k)
+            return pd.DataFrame({'Similarity': scores[chosen].round(4), 'Clients': together[chosen]},
+                                index=pd.Index([self.product_ids[position] for position in chosen], name='Product ID'))
+
+    def similar_clients(self, client_id, k=NEIGHBOURS, measure='Quantity'):
+        """returns the rows and cosine similarities of the k clients buying most like a client"""
+        row = self.client_rows[client_id]
+        _, columns, bought = self.client_entries(np.array([row]), measure)
+        owners, rows, values = self.product_entries(columns, measure)
+        scores = np.bincount(rows, values * bought[owners], len(self.client_ids))
+        norms = self.client_norms(measure)
+        norms = norms * norms[row]
+        scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+        scores[row] = 0
+        chosen = largest(scores, k)
+        return chosen, scores[chosen]
+
+    def suggested_products(self, client_id, k=10, measure='Quantity', neighbours=NEIGHBOURS):
+        """returns the k products the most similar clients buy and this client does not: score of
+        a product = its share of what the similar clients buy, weighted by their similarity"""
+        with self.lock:
+            if client_id not in self.client_rows:
+                return empty(['Score', 'Similar Clients'], 'Product ID')
+            rows, similarities = self.similar_clients(client_id, neighbours, measure)
+            owners, columns, values = self.client_entries(rows, measure)
+            # every similar client counts by its similarity, whatever its size
+            shares = values / np.maximum(self.client_norms(measure)[rows], 1e-12)[owners]
+            scores = np.bincount(columns, shares * similarities[owners], len(self.product_ids))
+            buyers = np.bincount(columns, minlength=len(self.product_ids))
+            if similarities.sum() > 0:
+                scores /= similarities.sum()
+            _, bought, _ = self.client_entries(np.array([self.client_rows[client_id]]), measure)
+            scores[bought] = 0
+            chosen = largest(scores, k)
+            return pd.DataFrame({'Score': scores[chosen].round(4), 'Similar Clients': buyers[chosen]},
+                                index=pd.Index([self.product_ids[position] for position in chosen], name='Product ID'))
+
+
+def bounds(pointers, indexes):
+    """returns the start and stop of some rows/columns in CSR pointers (empty for rows/columns
+    added after the pointers were computed)"""
+    inside = indexes < len(pointers) - 1
+    starts = np.zeros(len(indexes), dtype='int64')
+    stops = np.zeros(len(indexes), dtype='int64')
+    starts[inside] = pointers[indexes[inside]]
+    stops[inside] = pointers[indexes[inside] + 1]
+    return starts, stops
+
+
+def spans(starts, stops):
+    """returns every position from starts[i] to stops[i] (excluded), one span after the other,
+    and the span i of each position"""
+    lengths = stops - starts
+    if len(lengths) == 0 or lengths.sum() == 0:
+        return np.zeros(0, dtype='int64'), np.zeros(0, dtype='int64')
+    ends = np.cumsum(lengths)
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    return np.arange(ends[-1]) + (starts - (ends - lengths))[owners], owners
+
+
+def largest(scores, k):
+    """returns the positions of the k largest positive scores, highest first"""
+    candidates = np.flatnonzero(scores > 0)
+    if k < len(candidates):
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def empty(columns, name):
+    """returns an empty result table"""
+    return pd.DataFrame({column: [] for column in columns}, index=pd.Index([], name=name))
@@ -0,0 +1,272 @@
+"""
+This cube_module.py contains AggregateCube class, which holds order totals and quantities
+pre-aggregated by year, month, client, product, category and province.
+The cube is built once from the order data and every report/plot reads a slice of it.
+It is the in-memory (pandas) OrderBackend, see backend_module.py.
+The fact table also keeps the day of the month, so date ranges starting or ending inside a month
+are summed exactly in every loading mode (in memory, streamed or sharded).
+This module is imported to loader_module.py, report_module.py, shard_module.py and sqlite_module.py.
+"""
+import hashlib
+import os
+import pandas as pd
+from backend_module import OrderBackend
+from cache_module import file_signature, cache_path, load_cached, save_cached
+from schema_module import MONEY_COLUMNS, SCHEMA_VERSION, to_money, parse_orders, read_order_chunks
+from topk_module import select_largest
+
+MONTHS = list(range(1, 13))
+# cube-<mode>-<digest of the source files>.pkl: every loading mode and set of shard files keeps its own
+CUBE_FILE = 'cube-{mode}-{sources}.pkl'
+CUBE_VERSION = 4
+CHUNK_SIZE = 100000
+# chunk fact tables kept before they are merged together
+MERGE_CHUNKS = 8
+
+
+class AggregateCube(OrderBackend):
+    """define aggregate cube class"""
+    # dimensions of the fact table: the day is only read for the first/last month of a date range
+    FACT_DIMENSIONS = OrderBackend.DIMENSIONS + ['Day']
+
+    def __init__(self, facts):
+        """Creates a cube from a fact table with one row per dimension combination"""
+        super().__init__()
+        self.facts = facts
+        # fact tables of appended orders, merged into facts when a new rollup is needed
+        self.pending = []
+        self.rollups = {}
+
+    @staticmethod
+    def dimension_maps(product_list, client_list):
+        """returns the category of each product ID and the province of each client ID,
+        with the names written as labels"""
+        categories = {product.id: label(product.category) for product in product_list}
+        provinces = {client.id: label(client.province) for client in client_list}
+        return categories, provinces
+
+    @classmethod
+    def build(cls, order_data, product_list, client_list):
+        """aggregates order data into a cube"""
+        categories, provinces = cls.dimension_maps(product_list, client_list)
+        return cls(cls.aggregate(order_data, categories, provinces))
+
+    @classmethod
+    def stream(cls, filename, product_list, client_list, chunksize=CHUNK_SIZE):
+        """aggregates order csv file chunk by chunk, so only one chunk of orders is in memory"""
+        categories, provinces = cls.dimension_maps(product_list, client_list)
+        return cls(cls.aggregate_file(filename, categories, provinces, chunksize)[0])
+
+    @classmethod
+    def aggregate_file(cls, filename, categories, provinces, chunksize=CHUNK_SIZE):
+        """returns the fact table of an order csv file read chunk by chunk, and its number of orders"""
+        # fact tables of the chunks, merged a few at a time instead of after every chunk
+        fact_tables = []
+        rows = 0
+        for chunk in read_order_chunks(filename, chunksize):
+            rows += len(chunk)
+            fact_tables.append(cls.aggregate(chunk, categories, provinces))
+            if len(fact_tables) > MERGE_CHUNKS:
+                fact_tables = [cls.merge(fact_tables)]
+        if not fact_tables:
+            return cls.aggregate(parse_orders(filename), categories, provinces), rows
+        if len(fact_tables) == 1:
+            return fact_tables[0], rows
+        return cls.merge(fact_tables), rows
+
+    @classmethod
+    def aggregate(cls, order_data, categories, provinces):
+        """returns the fact table of order data: totals and quantities for each dimension combination"""
+        data = pd.DataFrame({
+            'Year': order_data['Date'].dt.year,
+            'Month': order_data['Date'].dt.month,
+            'Day': order_data['Date'].dt.day,
+            'Client ID': order_data['Client ID'],
+            'Product ID': order_data['Product ID'],
+            'Category': order_data['Product ID'].map(categories),
+            'Province': order_data['Client ID'].map(provinces),
+            'Total': order_data['Total'],
+            'Quantity': order_data['Quantity'].astype('float64'),
+        })
+        return data.groupby(cls.FACT_DIMENSIONS, as_index=False, observed=True, dropna=False).sum()
+
+    @classmethod
+    def merge(cls, fact_tables):
+        """adds several fact tables together into one"""
+        facts = pd.concat(fact_tables, ignore_index=True)
+        for dimension in ['Client ID', 'Product ID', 'Category', 'Province']:
+            facts[dimension] = facts[dimension].astype('category')
+        return facts.groupby(cls.FACT_DIMENSIONS, as_index=False, observed=True, dropna=False).sum()
+
+    @classmethod
+    def load_or_build(cls, build, sources=None, mode='memory'):
+        """reuses the cube stored next to the csv files, or calls build and stores the new cube.
+        mode: the loading mode (memory, stream, shards), so switching modes does not overwrite it"""
+        if not sources:
+            return build()
+        path = cache_path(sources[0], cube_file(mode, sources))
+        signature = (SCHEMA_VERSION, CUBE_VERSION, file_signature(sources))
+        facts = load_cached(path, signature)
+        if facts is not None:
+            return cls(facts)
+        cube = build()
+        save_cached(path, signature, cube.facts)
+        return cube
+
+    def append(self, facts):
+        """adds the fact table of new orders; rollups already computed are replaced by updated
+        copies, changed only for the dimension values found in the new orders"""
+        with self.lock:
+            self.pending.append(facts)
+            for key, rollup in self.rollups.items():
+                dimensions, measure = key
+                self.rollups[key] = add_into(rollup, self.group(facts, dimensions, measure))
+            self.changed()
+
+    def add_orders(self, new_orders, categories, provinces):
+        """aggregates a batch of new orders and appends its fact table"""
+        self.append(self.aggregate(new_orders, categories, provinces))
+
+    def consolidate(self):
+        """merges the fact tables of appended orders into the main fact table"""
+        with self.lock:
+            if self.pending:
+                self.facts = self.merge([self.facts] + self.pending)
+                self.pending = []
+
+    @staticmethod
+    def group(facts, dimensions, measure):
+        """sums a measure of a fact table over the given dimensions (money in NZD)"""
+        grouped = facts.groupby(list(dimensions), observed=True)[measure].sum()
+        if measure in MONEY_COLUMNS:
+            grouped = to_money(grouped)
+        return grouped
+
+    def rollup(self, *dimensions, measure='Total'):
+        """returns the measure summed over the given dimensions (money in NZD)"""
+        key = (dimensions, measure)
+        with self.lock:
+            if key not in self.rollups:
+                self.consolidate()
+                self.rollups[key] = self.group(self.facts, dimensions, measure)
+            return self.rollups[key]
+
+    def total(self, measure='Total'):
+        """returns the grand total of a measure (money in NZD)"""
+        with self.lock:
+            self.consolidate()
+            total = self.facts[measure].sum()
+        if measure in MONEY_COLUMNS:
+            total = to_money(total)
+        return total
+
+    def slice(self, dimension, value, *by, measure='Total'):
+        """returns the measure of one dimension value, summed by other dimensions"""
+        rollup = self.rollup(dimension, *by, measure=measure)
+        try:
+            return rollup.xs(value, level=0)
+        except KeyError:
+            return rollup.iloc[0:0].droplevel(0)
+
+    def years(self):
+        """returns the years found in the order data"""
+        return sorted(int(year) for year in self.rollup('Year').index)
+
+    def year_month(self, dimension=None, value=None, measure='Total'):
+        """returns the measure by (year, month), for everything or for one dimension value"""
+        if dimension is None:
+            return self.rollup('Year', 'Month', measure=measure)
+        return self.slice(dimension, value, 'Year', 'Month', measure=measure)
+
+    def monthly(self, dimension=None, value=None, measure='Total', year=None):
+        """returns the measure in each of the 12 months of a year (the latest year by default)"""
+        if year is None:
+            year = self.latest_year()
+        data = self.year_month(dimension, value, measure)
+        try:
+            monthly_total = data.xs(year, level='Year')
+        except KeyError:
+            monthly_total = data.iloc[0:0].droplevel('Year')
+        return monthly_total.reindex(MONTHS, fill_value=0)
+
+    def between(self, start, end, dimension=None, value=None, measure='Total'):
+        """returns the measure in each month from start to end date, indexed by pd.Period.
+        Whole months are read from the cube; the first and last month, when only partly
+        inside the range, are read from the order store when the orders are in memory,
+        otherwise from the days of the fact table"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        periods = pd.period_range(start, end, freq='M')
+        data = self.year_month(dimension, value, measure)
+        keys = pd.MultiIndex.from_arrays([periods.year, periods.month])
+        result = pd.Series(data.reindex(keys, fill_value=0).to_numpy(), index=periods, name=measure)
+        for period in set(periods[:1]) | set(periods[-1:]):
+            first = max(start, period.start_time)
+            last = min(end, period.end_time.normalize())
+            if first > period.start_time or last < period.end_time.normalize():
+                if self.store is not None and dimension in (None, 'Client ID', 'Product ID'):
+                    result[period] = self.store.total(first, last, dimension, value, measure)
+                else:
+                    result[period] = self.days_total(first, last, dimension, value, measure)
+        return result
+
+    def days_total(self, first, last, dimension=None, value=None, measure='Total'):
+        """returns the measure from the first to the last day of one month (money in NZD)"""
+        levels = ('Year', 'Month', 'Day')
+        if dimension is None:
+            days = self.rollup(*levels, measure=measure)
+        else:
+            days = self.slice(dimension, value, *levels, measure=measure)
+        try:
+            days = days.xs((first.year, first.month), level=('Year', 'Month'))
+        except KeyError:
+            return 0
+        return days[(days.index >= first.day) & (days.index <= last.day)].sum()
+
+    def top(self, column, measure, k, filters=(), months=None):
+        """returns the k biggest sums of a measure by column, highest first, read from a rollup"""
+        levels = [name for name, value in filters]
+        if months is not None:
+            levels.append('Month')
+        sums = self.rollup(*levels, column, measure=measure)
+        if filters:
+            try:
+                if len(filters) == 1:
+                    sums = sums.xs(filters[0][1], level=0)
+                else:
+                    sums = sums.xs(tuple(value for name, value in filters), level=list(range(len(filters))))
+            except KeyError:
+                return pd.Series([], dtype='float64', name=measure)
+        if months is not None:
+            month = sums.index.get_level_values('Month')
+            sums = sums[(month >= months[0]) & (month <= months[1])]
+            sums = sums.groupby(level=column, observed=True).sum()
+        return select_largest(sums, k)
+
+
+def cube_file(mode, sources):
+    """returns the name of the cube cache file of a loading mode and its source csv files"""
+    digest = hashlib.sha1('\n'.join(os.path.abspath(source) for source in sources).encode()).hexdigest()[:12]
+    return CUBE_FILE.format(mode=mode, sources=digest)
+
+
+def label(name):
+    """returns a category/province name as a label: 'foliar fertilizer' -> 'Foliar Fertilizer'
+    (names that already have capitals, like 'NPK', are kept)"""
+    name = str(name).strip()
+    if name.islower():
+        return name.title()
+    return name
+
+
+def add_into(rollup, delta):
+    """returns a new rollup with delta added: existing entries are updated, new entries inserted.
+    The rollup itself is never changed, background jobs may be reading it without the lock"""
+    positions = rollup.index.get_indexer(delta.index)
+    found = positions >= 0
+    if found.any():
+        values = rollup.to_numpy(dtype='float64', copy=True)
+        values[positions[found]] += delta.to_numpy()[found]
+        rollup = pd.Series(values, index=rollup.index, name=rollup.name)
+    if not found.all():
+        rollup = pd.concat([rollup, delta[~found]]).sort_index()
+    return rollup
@@ -0,0 +1,237 @@
+"""
+This export.py is the headless entry point next to main.py: it loads the data once, then renders
+every client and product chart and detail table, and the full report set, into PNG/PDF/CSV files.
+The work is spread over a pool of worker processes drawing with the Agg backend (no window).
+Workers are forked after the data is loaded, so they read the report of the parent process
+(shared copy-on-write pages) instead of receiving a pickled copy of the order data. Where fork is
+not available, every worker loads the data (from the csv cache) once when it starts.
+With the SQLite backend every worker opens its own connections to the database file.
+
+Usage: python export.py [--out exports] [--formats png pdf csv] [--workers 8]
+                        [--only clients products report] [--data folder] [--stream]
+                        [--shards path ...] [--backend memory|sqlite] [--database file]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from table_module import Table, write_csv
+
+FORMATS = ['png', 'pdf', 'csv']
+PARTS = ['clients', 'products', 'report']
+REPORT_ITEMS = ['category', 'province', 'monthly', 'year_over_year', 'top10_clients', 'top10_products',
+                'diamond_clients']
+DIAMOND_THRESHOLD = 30000
+
+# report of this process: loaded before the workers are forked, or by each worker without fork
+REPORT = None
+# chart of this process, reused for every file so only the changed artists are redrawn
+CHART = None
+
+
+def parse_arguments():
+    """reads command line options"""
+    parser = argparse.ArgumentParser(description="Sales Management report export")
+    parser.add_argument("--out", default="exports", help="folder the files are written to")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--only", nargs="+", choices=PARTS, default=PARTS,
+                        help="export only clients, products and/or the report")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--data", default=".", help="folder of the csv files")
+    parser.add_argument("--threshold", type=float, default=DIAMOND_THRESHOLD,
+                        help="revenue threshold (NZD) of the diamond clients table")
+    parser.add_argument("--stream", action="store_true",
+                        help="read order data in chunks instead of loading it all into memory")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="number of orders read at a time in streaming mode")
+    parser.add_argument("--shards", nargs="+", default=None, metavar="PATH",
+                        help="order csv files of each province (or folders of them) aggregated in parallel")
+    parser.add_argument("--shard-workers", type=int, default=None,
+                        help="worker processes aggregating the shards (default: one per core)")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="keep order data in memory (pandas) or in an indexed SQLite file")
+    parser.add_argument("--database", default=None,
+                        help="SQLite file of the sqlite backend (default: in the cache folder)")
+    return parser.parse_args()
+
+
+def load(options):
+    """loads the csv files of the data folder into the report of this process"""
+    global REPORT
+    from loader_module import load_data
+    if getattr(options, 'shards', None):
+        # shard paths are relative to the folder export.py was started in, not to the data folder
+        options.shards = [os.path.abspath(path) for path in options.shards]
+    os.chdir(options.data)
+    REPORT = load_data(options)
+    return REPORT
+
+
+def start_worker(options):
+    """loads the data in a worker process that was not forked from the loaded parent"""
+    if REPORT is None:
+        load(options)
+
+
+def chart():
+    """returns the file chart of this process"""
+    global CHART
+    if CHART is None:
+        from chart_module import FileChart
+        CHART = FileChart()
+    return CHART
+
+
+def save(base, formats, data=None):
+    """saves the chart as images and its data as csv, returns the number of files written"""
+    written = 0
+    for file_format in formats:
+        if file_format == 'csv':
+            if data is None:
+                continue
+            data.to_csv(f"{base}.csv")
+        else:
+            CHART.save(f"{base}.{file_format}")
+        written += 1
+    return written
+
+
+def export_clients(client_ids, out, formats):
+    """writes the details, top 5 products and monthly total of some clients"""
+    cube = REPORT.cube
+    written = 0
+    for client_id in client_ids:
+        client = REPORT.clients.get(client_id)
+        base = os.path.join(out, 'clients', str(client_id))
+        if 'csv' in formats:
+            write_csv(Table(["Field", "Value"], client.details()), f"{base}_details.csv")
+            written += 1
+        top5 = client.top_5_products(cube)
+        client.plot_top_5_products(cube, top5, chart())
+        written += save(f"{base}_top5", formats, top5)
+        monthly = client.monthly_total(cube)
+        client.plot_monthly_total(cube, monthly, chart())
+        written += save(f"{base}_monthly", formats, monthly)
+    return written
+
+
+def export_products(product_ids, out, formats):
+    """writes the details, top 5 clients and monthly total of some products"""
+    cube = REPORT.cube
+    written = 0
+    for product_id in product_ids:
+        product = REPORT.products.get(product_id)
+        base = os.path.join(out, 'products', str(product_id))
+        if 'csv' in formats:
+            write_csv(Table(["Field", "Value"], product.details()), f"{base}_details.csv")
+            written += 1
+        top5 = product.top_5_clients(cube)
+        product.plot_top_5_clients(cube, top5, chart())
+        written += save(f"{base}_top5", formats, top5)
+        monthly = product.monthly_total(cube)
+        product.plot_monthly_total(cube, monthly, chart())
+        written += save(f"{base}_monthly", formats, monthly)
+    return written
+
+
+def export_report(items, out, formats, threshold=DIAMOND_THRESHOLD):
+    """writes some charts/tables of the report"""
+    import pandas as pd
+    written = 0
+    for item in items:
+        base = os.path.join(out, 'report', item)
+        if item == 'category':
+            data = REPORT.category_revenue()
+            REPORT.plot_category_revenue(data, chart())
+            written += save(base, formats, pd.Series(data, name='Total'))
+        elif item == 'province':
+            data = REPORT.province_revenue()
+            REPORT.plot_province_revenue(data, chart())
+            written += save(base, formats, pd.Series(data, name='Total'))
+        elif item == 'monthly':
+            data = REPORT.monthly_revenue()
+            REPORT.plot_monthly_revenue(data, chart())
+            written += save(base, formats, data)
+        elif item == 'year_over_year':
+            data = REPORT.year_over_year()
+            REPORT.plot_year_over_year(data, chart())
+            written += save(base, formats, data)
+        elif item == 'top10_clients':
+            data = REPORT.top_10_clients()
+            REPORT.plot_top_10_clients(data, chart())
+            written += save(base, formats, data)
+        elif item == 'top10_products':
+            data = REPORT.top_10_products()
+            REPORT.plot_top_10_Products(data, chart())
+            written += save(base, formats, data)
+        elif item == 'diamond_clients' and 'csv' in formats:
+            write_csv(REPORT.diamond_table(threshold), f"{base}.csv")
+            written += 1
+    return written
+
+
+def run_task(task):
+    """runs one task (part, keys, out, formats, threshold) in a worker, returns the files written"""
+    part, keys, out, formats, threshold = task
+    if part == 'clients':
+        return export_clients(keys, out, formats)
+    if part == 'products':
+        return export_products(keys, out, formats)
+    return export_report(keys, out, formats, threshold)
+
+
+def tasks(options, out, workers):
+    """splits the export into tasks of a few keys each, so the workers stay evenly busy"""
+    keys = {'clients': REPORT.clients.ids(), 'products': REPORT.products.ids(), 'report': REPORT_ITEMS}
+    task_list = []
+    for part in options.only:
+        part_keys = list(keys[part])
+        size = 1 if part == 'report' else max(1, len(part_keys) // (workers * 8))
+        for start in range(0, len(part_keys), size):
+            task_list.append((part, part_keys[start:start + size], out, options.formats, options.threshold))
+    return task_list
+
+
+def warm_up():
+    """computes the cube rollups the exports read, once in the parent before the workers fork"""
+    cube = REPORT.cube
+    cube.consolidate()
+    for client_id in REPORT.clients.ids()[:1]:
+        client = REPORT.clients.get(client_id)
+        client.top_5_products(cube)
+        client.monthly_total(cube)
+    for product_id in REPORT.products.ids()[:1]:
+        product = REPORT.products.get(product_id)
+        product.top_5_clients(cube)
+        product.monthly_total(cube)
+
+
+def main():
+    """main function"""
+    options = parse_arguments()
+    out = os.path.abspath(options.out)
+    for part in PARTS:
+        os.makedirs(os.path.join(out, part), exist_ok=True)
+    start = time.perf_counter()
+    load(options)
+    warm_up()
+    loaded = time.perf_counter()
+    task_list = tasks(options, out, options.workers)
+    if options.workers <= 1:
+        written = sum(run_task(task) for task in task_list)
+    else:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            pool = ProcessPoolExecutor(options.workers, mp_context=multiprocessing.get_context('fork'))
+        else:
+            options.data = os.getcwd()
+            pool = ProcessPoolExecutor(options.workers, initializer=start_worker, initargs=(options,))
+        with pool:
+            written = sum(pool.map(run_task, task_list))
+    finished = time.perf_counter()
+    print(f"{written} files written to {out} by {options.workers} worker(s): "
+          f"loading {loaded - start:.1f} s, exporting {finished - loaded:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+This forecast_module.py contains the forecast engine: it projects the months of a year not yet
+known for every client, product, category or province at once, and compares the projected year
+with the monthly targets.
+The monthly revenue of all entities is read from the order backend as one matrix (entities x 12
+months) and each method works on the whole matrix with numpy, without a loop over the entities:
+- moving average: the mean of the last known months
+- seasonal naive: the same months of the year before (the moving average for entities without
+  orders that year, so a first year of data is not projected as 0)
+- linear trend: a least squares line through the known months
+This module is imported to report_module.py.
+"""
+import numpy as np
+import pandas as pd
+from topk_module import DIMENSIONS
+
+MONTHS = list(range(1, 13))
+METHODS = ['moving average', 'seasonal naive', 'linear trend']
+WINDOW = 3
+
+
+def moving_average(actual, known, previous=None, window=WINDOW):
+    """returns the matrix with the unknown months set to the mean of the last window known months"""
+    projection = actual.astype('float64')
+    if 0 < known < 12:
+        projection[:, known:] = actual[:, max(0, known - window):known].mean(axis=1, keepdims=True)
+    return projection
+
+
+def seasonal_naive(actual, known, previous=None):
+    """returns the matrix with the unknown months set to the same months of the year before;
+    rows without orders in the year before get the moving average"""
+    projection = moving_average(actual, known)
+    if previous is not None and known < 12:
+        rows = history(previous)
+        projection[rows, known:] = previous[rows, known:]
+    return projection
+
+
+def history(previous):
+    """returns which rows of the year before have orders"""
+    return previous.sum(axis=1) > 0
+
+
+def linear_trend(actual, known, previous=None):
+    """returns the matrix with the unknown months on the least squares line through the known
+    months of each row (never below 0); with fewer than 2 known months, the moving average"""
+    if known < 2:
+        return moving_average(actual, known)
+    projection = actual.astype('float64')
+    if known < 12:
+        months = np.arange(known)
+        centred = months - months.mean()
+        means = projection[:, :known].mean(axis=1, keepdims=True)
+        slopes = ((projection[:, :known] - means) * centred).sum(axis=1, keepdims=True) / (centred ** 2).sum()
+        future = np.arange(known, 12) - months.mean()
+        projection[:, known:] = np.maximum(means + slopes * future, 0)
+    return projection
+
+
+PROJECTIONS = {'moving average': moving_average, 'seasonal naive': seasonal_naive, 'linear trend': linear_trend}
+
+
+def monthly_matrix(backend, year, dimension=None):
+    """returns the entities and their revenue in each month of a year as an (entities x 12) array"""
+    if dimension is None:
+        return pd.Index(['All'], name='All'), np.array([backend.monthly(year=year).to_numpy()], dtype='float64')
+    column = DIMENSIONS[dimension]
+    data = backend.slice('Year', year, column, 'Month').unstack('Month', fill_value=0)
+    data = data.reindex(columns=MONTHS, fill_value=0)
+    return data.index, np.array(data.to_numpy(), dtype='float64')
+
+
+def known_months(backend, year):
+    """returns the number of months of a year with orders up to the last one (0 to 12)"""
+    monthly_total = backend.monthly(year=year).to_numpy()
+    found = np.flatnonzero(monthly_total)
+    return int(found[-1]) + 1 if len(found) else 0
+
+
+def forecast(backend, targets, dimension=None, year=None, method='linear trend', known=None):
+    """returns the projected year of every entity of a dimension (client/product/category/province,
+    everything together when None): one row per entity with the 12 months (known months as they
+    are, the others projected), the total known so far, the projected year, the target and the gap.
+    targets: the 12 monthly targets of the company; an entity gets the share of them matching its
+    share of the revenue known so far.
+    known: months of the year already known, by default up to the last month with orders.
+    attrs: year, known, method and fallback, the number of entities the method could not project
+    (seasonal naive without orders in the year before), projected by the moving average instead"""
+    if year is None:
+        year = backend.latest_year()
+    if known is None:
+        known = known_months(backend, year)
+    entities, actual = monthly_matrix(backend, year, dimension)
+    previous = None
+    # entities projected by the moving average because the method has nothing to work from
+    fallback = 0
+    if method == 'seasonal naive':
+        previous_entities, previous_actual = monthly_matrix(backend, year - 1, dimension)
+        previous = pd.DataFrame(previous_actual, index=previous_entities).reindex(entities, fill_value=0).to_numpy()
+        fallback = int((~history(previous)).sum()) if known < 12 else 0
+    actual[:, known:] = 0
+    projection = PROJECTIONS[method](actual, known, previous)
+    so_far = actual[:, :known].sum(axis=1)
+    shares = so_far / so_far.sum() if so_far.sum() else np.full(len(so_far), 1 / max(len(so_far), 1))
+    target = shares * float(np.sum(targets))
+    result = pd.DataFrame(projection, index=entities, columns=MONTHS)
+    result['Actual'] = so_far
+    result['Projected'] = projection.sum(axis=1)
+    result['Target'] = target
+    result['Gap'] = result['Projected'] - target
+    result['On Track'] = result['Gap'] >= 0
+    result.attrs.update({'year': year, 'known': known, 'method': method, 'fallback': fallback})
+    return result
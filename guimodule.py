@@ -4,30 +4,51 @@ This module is imported to main.py.
 """
 import tkinter as tk
 from tkinter.ttk import *
-from tkinter import Frame
+from tkinter import Frame, filedialog
+from datetime import datetime
 from art import art_line, welcome
+from worker_module import BackgroundRunner
+from chart_module import ChartPanel
+from tableview_module import VirtualTable
+from autocomplete_module import Autocomplete
+from instrument_module import INSTRUMENTS, timed
 
 GOOD_THRESHOLD = 30000
+STATS_REFRESH_MS = 1000
 
 class SalesManagementGui:
     """define Sales Management GUI class"""
 
-    def __init__(self, window, client_list, product_list, order_data, report):
-        """Setup GUI on given window and get the necessary data"""
-        self.client_list = client_list
-        self.product_list = product_list
-        self.report = report
-        self.order_data = order_data
+    def __init__(self, window, report=None):
+        """Setup GUI on given window; the report can be attached later once the data is loaded"""
+        self.report = None
+        self.clients = None
+        self.products = None
+        self.window = window
+        self.runner = BackgroundRunner(window, self.show_busy)
+        window.protocol("WM_DELETE_WINDOW", self.close)
 
         # ================= CREATE TKINTER FRAMES ================================================
 
         # Create 2 Frame: header Frame and main Frame
-        self.header = Frame(window, bg='#6cba9f', width=800, height=50)
+        self.header = Frame(window, bg='#6cba9f', width=1450, height=50)
         self.header.grid(row=0, column=0, columnspan=2)
 
         self.body = Frame(window, bg='white', width=800, height=600)
         self.body.grid(row=1, column=0, rowspan=2)
 
+        # chart frame on the right: one canvas per tab, created once and redrawn on each plot
+        self.chart_frame = Frame(window, bg='white', width=650, height=600)
+        self.chart_frame.grid(row=1, column=1, rowspan=2, sticky='n')
+        self.chart_tabs = Notebook(self.chart_frame)
+        self.chart_tabs.pack(fill='both', expand=True)
+        # the canvas of a tab is only created (and matplotlib loaded) on the first plot
+        self.charts = {}
+        for name in ["Client", "Product", "Report"]:
+            tab = Frame(self.chart_tabs, bg='white', width=640, height=480)
+            self.chart_tabs.add(tab, text=name)
+            self.charts[name] = (tab, None)
+
         # Setup header frame
         self.header.grid_propagate(0)
         self.header.grid_rowconfigure(0, weight=1)
@@ -69,6 +90,13 @@ class SalesManagementGui:
                                    )
         self.text_widget.pack()
         self.text_widget.insert('1.0', welcome)
+        # long results (diamond clients) are shown in a virtualized table instead of the text
+        self.table_frame = Frame(self.bottom_body, bg='white')
+        self.table_frame.grid_columnconfigure(0, weight=1)
+        self.table_caption = tk.Label(self.table_frame, text='', bg='white', fg="#a30b1b")
+        self.table_caption.grid(row=0, column=0, columnspan=2, sticky='w')
+        self.table_view = VirtualTable(self.table_frame, height=20)
+        self.table_view.grid(row=1, column=0)
 
 
         # ========== set widgets for clients report===========
@@ -80,6 +108,9 @@ class SalesManagementGui:
         self.client_lab.grid(row=1, column=0)
         self.client_entry = tk.Entry(self.top_body, width=15)
         self.client_entry.grid(row=1, column=1)
+        # dropdown of the clients whose ID or store name starts with what is typed
+        self.client_complete = Autocomplete(self.client_entry, self.suggest_clients,
+                                            lambda client_id: self.print_client_info())
         self.client_btn = tk.Button(self.top_body, text='Inspect',
                                     command=self.print_client_info)
         self.client_btn.grid(row=1, column=2)
@@ -90,6 +121,9 @@ class SalesManagementGui:
         self.client_monthly_btn = tk.Button(self.top_body, text='Plot Monthly Total',
                                             command=self.plot_client_monthly_total)
         self.client_monthly_btn.grid(row=3, column=1)
+        self.client_suggest_btn = tk.Button(self.top_body, text='Suggest Products',
+                                            command=self.show_suggested_products)
+        self.client_suggest_btn.grid(row=4, column=1)
 
         # ========== set widgets for product report=========================
 
@@ -100,6 +134,8 @@ class SalesManagementGui:
         self.product_lab.grid(row=6, column=0)
         self.product_entry = tk.Entry(self.top_body, width=15)
         self.product_entry.grid(row=6, column=1)
+        self.product_complete = Autocomplete(self.product_entry, self.suggest_products,
+                                             lambda product_id: self.print_product_info())
         self.product_btn = tk.Button(self.top_body, text='Inspect',
                                      command=self.print_product_info)
         self.product_btn.grid(row=6, column=2)
@@ -110,6 +146,9 @@ class SalesManagementGui:
         self.product_monthly_btn = tk.Button(self.top_body, text='Plot Monthly Total',
                                              command=self.plot_product_monthly_total)
         self.product_monthly_btn.grid(row=9, column=1)
+        self.product_similar_btn = tk.Button(self.top_body, text='Similar Products',
+                                             command=self.similar_products)
+        self.product_similar_btn.grid(row=7, column=1)
 
         # ========== set widgets for general report=========================
 
@@ -147,121 +186,395 @@ class SalesManagementGui:
                                           value="client10"
                                           )
         self.report_opt5.grid(row=5, column=8)
-        self.report_btn = tk.Button(self.top_body, text='PLOT',
+        self.report_opt6 = tk.Radiobutton(self.top_body,
+                                          text="  Year over year against targets     ",
+                                          variable=self.storage_variable,
+                                          value="year"
+                                          )
+        self.report_opt6.grid(row=6, column=8)
+        self.report_opt7 = tk.Radiobutton(self.top_body,
+                                          text="  Forecast of the year against targets",
+                                          variable=self.storage_variable,
+                                          value="forecast"
+                                          )
+        self.report_opt7.grid(row=7, column=8)
+        # optional date range of the monthly charts (dd/mm/yyyy), the latest year when empty
+        self.range_frame = Frame(self.top_body)
+        self.range_frame.grid(row=8, column=8)
+        self.start_lab = tk.Label(self.range_frame, text="From:")
+        self.start_lab.grid(row=0, column=0)
+        self.start_entry = tk.Entry(self.range_frame, width=11)
+        self.start_entry.grid(row=0, column=1)
+        self.end_lab = tk.Label(self.range_frame, text="To:")
+        self.end_lab.grid(row=0, column=2)
+        self.end_entry = tk.Entry(self.range_frame, width=11)
+        self.end_entry.grid(row=0, column=3)
+        self.report_btn = tk.Button(self.range_frame, text='PLOT',
                                     command=self.plot_annual_report)
-        self.report_btn.grid(row=6, column=8)
+        self.report_btn.grid(row=0, column=4, padx=5)
 
-        self.result_message = tk.Label(self.bottom_body, text='', bg='white')
-        self.result_message.grid(row=0, column=0)
+        self.result_message = tk.Label(self.header, text='', bg='#6cba9f', fg='white')
+        self.result_message.grid(row=0, column=2, padx=10)
         self.threshold_lab = tk.Label(self.top_body,
                                       text="Enter revenue threshold (NZD) and check diamond clients")
-        self.threshold_lab.grid(row=8, column=8)
-        self.threshold_entry = tk.Entry(self.top_body, width=15)
-        self.threshold_entry.grid(row=9, column=8)
-        self.threshold_btn = tk.Button(self.top_body, text='Enter',
+        self.threshold_lab.grid(row=9, column=8)
+        # threshold entry and its button share a row, the report options take one row more
+        self.threshold_frame = Frame(self.top_body, bg='white')
+        self.threshold_frame.grid(row=10, column=8)
+        self.threshold_entry = tk.Entry(self.threshold_frame, width=15)
+        self.threshold_entry.grid(row=0, column=0)
+        self.threshold_btn = tk.Button(self.threshold_frame, text='Enter',
                                        command=self.print_vip_client)
-        self.threshold_btn.grid(row=10, column=8)
+        self.threshold_btn.grid(row=0, column=1, padx=5)
+
+        # ========== set widgets for adding new orders=========================
+
+        self.import_btn = tk.Button(self.top_body, text='Import New Orders',
+                                    command=self.import_orders)
+        self.import_btn.grid(row=10, column=1)
+
+        # ========== set diagnostics menu: timing stats, profiling and JSON dump ==========
+
+        self.stats_window = None
+        self.stats_text = None
+        self.profiling = tk.BooleanVar(value=INSTRUMENTS.profiling)
+        self.tracing_memory = tk.BooleanVar(value=INSTRUMENTS.tracing_memory)
+        self.menu_bar = tk.Menu(window)
+        self.diagnostics_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.diagnostics_menu.add_command(label="Timing Stats", command=self.show_stats)
+        self.diagnostics_menu.add_checkbutton(label="Profile Calls (cProfile)", variable=self.profiling,
+                                              command=lambda: INSTRUMENTS.set_profiling(self.profiling.get()))
+        self.diagnostics_menu.add_checkbutton(label="Trace Memory (tracemalloc)", variable=self.tracing_memory,
+                                              command=lambda: INSTRUMENTS.set_memory_tracing(
+                                                  self.tracing_memory.get()))
+        self.diagnostics_menu.add_separator()
+        self.diagnostics_menu.add_command(label="Save Stats As JSON...", command=self.dump_stats)
+        self.diagnostics_menu.add_command(label="Reset Stats", command=INSTRUMENTS.reset)
+        self.menu_bar.add_cascade(label="Diagnostics", menu=self.diagnostics_menu)
+        window.configure(menu=self.menu_bar)
+
+        # buttons wait until the data is loaded
+        self.data_buttons = [self.client_btn, self.client_top5_btn, self.client_monthly_btn,
+                             self.client_suggest_btn, self.product_btn, self.product_top5_btn,
+                             self.product_monthly_btn, self.product_similar_btn,
+                             self.report_btn, self.threshold_btn, self.import_btn]
+        if report is None:
+            for button in self.data_buttons:
+                button.configure(state='disabled')
+            self.result_message.configure(text='Loading data...')
+        else:
+            self.attach_report(report)
 
+    def attach_report(self, report):
+        """Gives the GUI its report once the data is loaded and enables the buttons"""
+        self.report = report
+        self.clients = report.clients
+        self.products = report.products
+        INSTRUMENTS.watch('chart cache', report.cube.chart_cache.stats)
+        # build the search indexes and the co-purchase matrix now, so the first keystroke
+        # or cross-sell query does not wait for them
+        self.runner.submit('index', lambda: (report.clients.prefix_index(), report.products.prefix_index(),
+                                             report.co_purchase()),
+                           lambda indexes: None, self.show_error)
+        for button in self.data_buttons:
+            button.configure(state='normal')
+        self.show_busy(self.runner.running)
+
+    @timed()
     def print_client_info(self):
         """Prints client information"""
         client_id = self.client_entry.get()
-        if client_id not in self.report.client_id_list():
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END,"This Client's ID is wrong. Please try again!")
+        if client_id not in self.clients:
+            self.show_text("This Client's ID is wrong. Please try again!"
+                           + self.did_you_mean(self.clients, client_id))
             # self.result_message.configure(text='This ID is wrong\n Please try again', fg='red')
         else:
             client_info = self.get_client_info(client_id)
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, client_info)
+            self.show_text(client_info)
 
             # self.result_message.configure(text=client_info, fg='red')
 
+    def suggest_clients(self, text, limit):
+        """returns (ID, store name) of the clients matching the text typed so far"""
+        if self.clients is None:
+            return []
+        return self.clients.suggest(text, limit)
+
+    def suggest_products(self, text, limit):
+        """returns (ID, name) of the products matching the text typed so far"""
+        if self.products is None:
+            return []
+        return self.products.suggest(text, limit)
+
+    @staticmethod
+    def did_you_mean(registry, text, limit=5):
+        """returns the IDs sharing the longest prefix with a wrong ID, as a line of text"""
+        text = text.strip()
+        while text:
+            matches = registry.suggest(text, limit)
+            if matches:
+                return "\nDid you mean: " + ", ".join(f"{object_id} ({name})" for object_id, name in matches)
+            text = text[:-1]
+        return ""
+
     def get_client_info(self, client_id):
         """gets client information"""
-        for client in self.client_list:
-            if client.id == client_id:
-                return client.client_details()
+        client = self.clients.get(client_id)
+        if client is not None:
+            return client.client_details()
 
+    @timed()
     def plot_top5_product(self):
         """Plots top 5 products of a particular client"""
         client_id = self.client_entry.get()
-        for client in self.client_list:
-            if client.id == client_id:
-                client.plot_top_5_products()
-
+        client = self.clients.get(client_id)
+        if client is not None:
+            cube = self.report.cube
+            self.runner.submit('client', lambda: client.top_5_products(cube),
+                               lambda data: client.plot_top_5_products(cube, data, self.chart("Client")),
+                               self.show_error)
+
+    @timed()
     def plot_client_monthly_total(self):
         """Plots monthly total from the client inspected"""
         client_id = self.client_entry.get()
-        for client in self.client_list:
-            if client.id == client_id:
-                client.plot_monthly_total()
-
+        client = self.clients.get(client_id)
+        if client is not None:
+            cube = self.report.cube
+            start, end = self.date_range()
+            self.runner.submit('client', lambda: client.monthly_total(cube, start, end),
+                               lambda data: client.plot_monthly_total(cube, data, self.chart("Client")),
+                               self.show_error)
+
+    @timed()
+    def show_suggested_products(self):
+        """Shows the products bought by the clients most like this client, that it does not buy yet"""
+        client_id = self.client_entry.get()
+        if client_id not in self.clients:
+            self.show_text("This Client's ID is wrong. Please try again!"
+                           + self.did_you_mean(self.clients, client_id))
+            return
+        self.runner.submit('client', lambda: self.report.suggested_products_table(client_id),
+                           lambda table: self.show_table(
+                               table, f"Products suggested for {client_id}: bought by similar clients, "
+                                      f"not yet by {client_id}"),
+                           self.show_error)
+
+    @timed()
     def print_product_info(self):
         """Prints product information"""
         product_id = self.product_entry.get()
-        if product_id not in self.report.product_id_list():
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, "This Product's ID is wrong. Please try again!")
+        if product_id not in self.products:
+            self.show_text("This Product's ID is wrong. Please try again!"
+                           + self.did_you_mean(self.products, product_id))
         else:
             product_info = self.get_product_info(product_id)
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, product_info)
+            self.show_text(product_info)
+
+    @timed()
+    def similar_products(self):
+        """Shows the products most often bought by the clients of this product"""
+        product_id = self.product_entry.get()
+        if product_id not in self.products:
+            self.show_text("This Product's ID is wrong. Please try again!"
+                           + self.did_you_mean(self.products, product_id))
+            return
+        self.runner.submit('product', lambda: self.report.similar_products_table(product_id),
+                           lambda table: self.show_table(
+                               table, f"Clients that buy {product_id} also buy (similarity of their buyers, "
+                                      f"clients buying both)"),
+                           self.show_error)
 
     def get_product_info(self, product_id):
         """gets product information"""
-        for product in self.product_list:
-            if product.id == product_id:
-                return product.product_details()
+        product = self.products.get(product_id)
+        if product is not None:
+            return product.product_details()
 
+    @timed()
     def plot_top5_clients(self):
         """Plots top 5 clients buying this product"""
         product_id = self.product_entry.get()
-        for product in self.product_list:
-            if product.id == product_id:
-                product.plot_top_5_clients()
-
+        product = self.products.get(product_id)
+        if product is not None:
+            cube = self.report.cube
+            self.runner.submit('product', lambda: product.top_5_clients(cube),
+                               lambda data: product.plot_top_5_clients(cube, data, self.chart("Product")),
+                               self.show_error)
+
+    @timed()
     def plot_product_monthly_total(self):
         """Plots monthly total from the product inspected"""
         product_id = self.product_entry.get()
-        for product in self.product_list:
-            if product.id == product_id:
-                product.plot_monthly_total()
-
+        product = self.products.get(product_id)
+        if product is not None:
+            cube = self.report.cube
+            start, end = self.date_range()
+            self.runner.submit('product', lambda: product.monthly_total(cube, start, end),
+                               lambda data: product.plot_monthly_total(cube, data, self.chart("Product")),
+                               self.show_error)
+
+    @timed()
     def plot_annual_report(self):
         """plotting total revenues in categories/months/provinces/top 10 products/Clients"""
-        if self.storage_variable.get() == "category":
-            self.report.category_revenue()
-            self.report.plot_category_revenue()
-        elif self.storage_variable.get() == "month":
-            self.report.plot_monthly_revenue()
-        elif self.storage_variable.get() == "province":
-            self.report.province_revenue()
-            self.report.plot_province_revenue()
-        elif self.storage_variable.get() == "product10":
-            self.report.plot_top_10_Products()
-        elif self.storage_variable.get() == "client10":
-            self.report.plot_top_10_clients()
-
+        report = self.report
+        start, end = self.date_range()
+        # the To date, when given, is the last month known by the forecast: the rest of its year is projected
+        year, known = (end.year, end.month) if end is not None else (None, None)
+        # calculation (background thread) and plot (tkinter thread) of each report option
+        options = {
+            "category": (report.category_revenue,
+                         lambda data: report.plot_category_revenue(data, self.chart("Report"))),
+            "month": (lambda: report.monthly_revenue(start, end),
+                      lambda data: report.plot_monthly_revenue(data, self.chart("Report"))),
+            "province": (report.province_revenue,
+                         lambda data: report.plot_province_revenue(data, self.chart("Report"))),
+            "product10": (report.top_10_products,
+                          lambda data: report.plot_top_10_Products(data, self.chart("Report"))),
+            "client10": (report.top_10_clients,
+                         lambda data: report.plot_top_10_clients(data, self.chart("Report"))),
+            "year": (report.year_over_year,
+                     lambda data: report.plot_year_over_year(data, self.chart("Report"))),
+            "forecast": (lambda: (report.forecasts(year, known),
+                                  report.forecast_table('client', year=year, known=known)),
+                         lambda data: self.show_forecast(*data)),
+        }
+        if self.storage_variable.get() in options:
+            work, draw = options[self.storage_variable.get()]
+            self.runner.submit('report', work, draw, self.show_error)
+
+    def show_forecast(self, forecasts, table):
+        """plots the forecast of the company and shows the forecast table of the clients"""
+        self.report.plot_forecast(forecasts, self.chart("Report"))
+        first = next(iter(forecasts.values()))
+        on_track = table.column("On Track").count('yes')
+        self.show_table(table, f"{on_track} of {len(table)} clients on track for their share of the "
+                               f"{first.attrs['year']} target (linear trend, click a column to sort)")
+
+    def date_range(self):
+        """returns the (start, end) dates typed in the From/To entries, or (None, None)
+        when they are empty or not dates in dd/mm/yyyy"""
+        try:
+            start = datetime.strptime(self.start_entry.get().strip(), '%d/%m/%Y')
+            end = datetime.strptime(self.end_entry.get().strip(), '%d/%m/%Y')
+        except ValueError:
+            return None, None
+        if start > end:
+            return None, None
+        return start, end
+
+    @timed()
     def print_vip_client(self):
         """Prints VIP client information"""
         threshold = self.threshold_entry.get()
         if threshold.isnumeric() == False:
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, f"Please input an amount of money which is at least {GOOD_THRESHOLD} NZD !")
+            self.show_text(f"Please input an amount of money which is at least {GOOD_THRESHOLD} NZD !")
         elif float(threshold) >= GOOD_THRESHOLD:
-            vip_list = self.report.print_diamond_clients(float(threshold))
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, vip_list)
+            self.runner.submit('vip', lambda: self.report.diamond_table(float(threshold)),
+                               lambda table: self.show_table(
+                                   table, f"{len(table)} clients with revenue of at least {threshold} NZD "
+                                          f"(click a column to sort)"),
+                               self.show_error)
         else:
-            self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', art_line)
-            self.text_widget.insert(tk.END, f"Please input threshold at least {GOOD_THRESHOLD} NZD")
+            self.show_text(f"Please input threshold at least {GOOD_THRESHOLD} NZD")
         # self.result_message.configure(text=vip_list, fg='red')
 
-
+    @timed()
+    def import_orders(self):
+        """Adds the orders of a csv file to the report without reloading the order data;
+        the file is read and appended in the background"""
+        filename = filedialog.askopenfilename(title="Select new orders",
+                                              filetypes=[("CSV files", "*.csv")])
+        if not filename:
+            return
+        # one import at a time: a second one would append its orders on top of this one
+        self.import_btn.configure(state='disabled')
+        self.runner.submit('import', lambda: self.report.append_order_file(filename),
+                           self.orders_imported, self.import_failed)
+
+    def orders_imported(self, added):
+        """Tells how many orders were imported and redraws the report chart with them"""
+        self.import_btn.configure(state='normal')
+        if self.charts["Report"][1] is not None:
+            self.plot_annual_report()
+        self.show_text(f"{added} new orders have been added.")
+
+    def import_failed(self, error):
+        """Tells why the orders could not be imported"""
+        self.import_btn.configure(state='normal')
+        self.show_text(f"Could not import the orders: {error}")
+
+    def chart(self, name):
+        """Brings the chart tab forward and returns its canvas"""
+        tab, chart = self.charts[name]
+        if chart is None:
+            chart = ChartPanel(tab)
+            chart.widget.pack(fill='both', expand=True)
+            self.charts[name] = (tab, chart)
+        self.chart_tabs.select(tab)
+        return chart
+
+    def show_text(self, text):
+        """Replaces the result area with a text"""
+        self.table_frame.pack_forget()
+        self.text_widget.pack()
+        self.text_widget.delete('1.0', tk.END)
+        self.text_widget.insert('1.0', art_line)
+        self.text_widget.insert(tk.END, str(text))
+
+    def show_table(self, table, caption=''):
+        """Replaces the result area with a table, only its visible rows are drawn"""
+        self.text_widget.pack_forget()
+        self.table_frame.pack(fill='both', expand=True)
+        self.table_caption.configure(text=caption)
+        self.table_view.show(table)
+
+    def show_error(self, error):
+        """Shows an error raised by a background calculation"""
+        self.show_text(f"Something went wrong: {error}")
+
+    def show_busy(self, count):
+        """Shows in the header how many calculations are still running"""
+        if count:
+            self.result_message.configure(text=f"Working... ({count})")
+            self.window.configure(cursor='watch')
+        else:
+            self.result_message.configure(text='')
+            self.window.configure(cursor='')
+
+    def show_stats(self):
+        """Opens a window with the live timing stats of the loaders, reports and handlers"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        self.stats_window = tk.Toplevel(self.window)
+        self.stats_window.title("Timing Stats")
+        self.stats_text = tk.Text(self.stats_window, width=86, height=30, font=('Courier', 10))
+        self.stats_text.pack(fill='both', expand=True)
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """Rewrites the timing stats window every second while it is open"""
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            return
+        self.stats_text.delete('1.0', tk.END)
+        self.stats_text.insert('1.0', INSTRUMENTS.summary())
+        profile = INSTRUMENTS.profile_top(10)
+        if profile:
+            self.stats_text.insert(tk.END, "\n\nProfiled functions (cumulative ms):\n")
+            for function in profile:
+                self.stats_text.insert(tk.END, f"{function['cumulative_ms']:>10.1f}  {function['function']}\n")
+        self.window.after(STATS_REFRESH_MS, self.refresh_stats)
+
+    def dump_stats(self):
+        """Saves all timing stats (and profile/memory captures) to a JSON file"""
+        filename = filedialog.asksaveasfilename(title="Save timing stats", defaultextension=".json",
+                                                filetypes=[("JSON files", "*.json")])
+        if filename:
+            INSTRUMENTS.dump(filename)
+            self.show_text(f"Timing stats saved to {filename}")
+
+    def close(self):
+        """Stops the background calculations and closes the window"""
+        self.runner.shutdown()
+        self.window.destroy()
@@ -0,0 +1,293 @@
+"""
+This instrument_module.py contains Instrumentation class, which records how often the loaders,
+report calculations and GUI handlers run, how long they take (latency histogram) and how many
+rows they go through. cProfile and tracemalloc captures can be switched on and off while the
+application runs, and every record can be dumped to a JSON file for offline analysis.
+Only the standard library is imported here, profiling modules are loaded when switched on.
+This module is imported to main.py, loader_module.py, report_module.py, client_module.py,
+product_module.py, worker_module.py, shard_module.py and guimodule.py.
+"""
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds (ms) of the latency histogram buckets, the last bucket has no bound
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class Record:
+    """define record class: the statistics of one instrumented name"""
+    __slots__ = ('calls', 'errors', 'total', 'slowest', 'rows', 'histogram', 'peak_memory')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.peak_memory = 0
+
+    def add(self, seconds, rows=0, failed=False, peak_memory=0):
+        """adds one call"""
+        self.calls += 1
+        self.errors += failed
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.rows += rows
+        self.peak_memory = max(self.peak_memory, peak_memory)
+        milliseconds = seconds * 1000
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and milliseconds > BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def percentile(self, percent):
+        """returns the upper bound (ms) of the bucket holding the given percentile of the calls"""
+        wanted = self.calls * percent / 100.0
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= wanted:
+                return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else float('inf')
+        return 0
+
+    def as_dict(self):
+        """returns the record as plain values for JSON"""
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.calls, 3) if self.calls else 0,
+            'max_ms': round(self.slowest * 1000, 3),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'rows': self.rows,
+            'peak_memory_kb': round(self.peak_memory / 1024, 1),
+            'histogram': dict(zip([f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"],
+                                  self.histogram)),
+        }
+
+
+class Instrumentation:
+    """define instrumentation class"""
+    def __init__(self):
+        """Creates empty statistics; profiling and memory tracing start switched off"""
+        self.lock = threading.Lock()
+        self.records = {}
+        self.started = time.time()
+        self.profiling = False
+        self.tracing_memory = False
+        # cProfile statistics of all profiled calls, merged together
+        self.profile_stats = None
+        # name -> function returning the current statistics of another part (e.g. a cache)
+        self.watched = {}
+        # nesting depth of instrumented calls in each thread, only the outermost one is profiled
+        self.local = threading.local()
+        # one cProfile capture at a time: Python allows a single active profiler
+        self.profiler_busy = False
+        # outermost calls running in any thread while memory is traced, the peak is reset by the first
+        self.memory_calls = 0
+
+    def record(self, name, seconds, rows=0, failed=False, peak_memory=0):
+        """adds one call of an instrumented name"""
+        with self.lock:
+            if name not in self.records:
+                self.records[name] = Record()
+            self.records[name].add(seconds, rows, failed, peak_memory)
+
+    @contextmanager
+    def measure(self, name):
+        """times the block inside a with statement; the yielded dict can be given a 'rows' count"""
+        counts = {'rows': 0}
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        profiler = self.profile_start() if self.profiling and depth == 0 else None
+        # nested calls are part of the outermost one: resetting the peak would lose its earlier peak
+        memory_before = self.memory_start() if depth == 0 else None
+        failed = False
+        start = time.perf_counter()
+        try:
+            yield counts
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.local.depth = depth
+            if profiler is not None:
+                self.profile_stop(profiler)
+            self.record(name, seconds, counts['rows'], failed, self.memory_peak(memory_before))
+
+    def timed(self, name=None, rows=None):
+        """decorator timing every call of a function.
+        rows(result, *args) returns the rows processed, by default the length of the result"""
+        def decorate(function):
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.measure(label) as counts:
+                    result = function(*args, **kwargs)
+                    counts['rows'] = count_rows(result, args, rows)
+                return result
+            return wrapper
+        return decorate
+
+    def watch(self, name, stats):
+        """adds the statistics returned by stats() to every snapshot and summary"""
+        self.watched[name] = stats
+
+    # ========== cProfile / tracemalloc switches ==========
+
+    def set_profiling(self, enabled):
+        """switches cProfile capture of instrumented calls on or off"""
+        self.profiling = enabled
+
+    def profile_start(self):
+        """returns a running cProfile profiler, or None while another call (in any thread) or
+        another profiling tool is being profiled"""
+        with self.lock:
+            if self.profiler_busy:
+                return None
+            self.profiler_busy = True
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiling tool is already active (Python 3.12+)
+            with self.lock:
+                self.profiler_busy = False
+            return None
+        return profiler
+
+    def profile_stop(self, profiler):
+        """stops a profiler of profile_start and merges its statistics"""
+        profiler.disable()
+        self.add_profile(profiler)
+        with self.lock:
+            self.profiler_busy = False
+
+    def add_profile(self, profiler):
+        """merges the statistics of one profiled call"""
+        import pstats
+        with self.lock:
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(profiler)
+            else:
+                self.profile_stats.add(profiler)
+
+    def profile_top(self, limit=20):
+        """returns the functions with the most cumulative time in the profiled calls"""
+        if self.profile_stats is None:
+            return []
+        with self.lock:
+            stats = self.profile_stats.stats
+            rows = sorted(stats.items(), key=lambda item: -item[1][3])[:limit]
+        return [{'function': f"{filename}:{line}({function})", 'calls': calls,
+                 'own_ms': round(own * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)}
+                for (filename, line, function), (primitive, calls, own, cumulative, callers) in rows]
+
+    def set_memory_tracing(self, enabled):
+        """switches tracemalloc on or off; while on, every call records its peak allocation"""
+        import tracemalloc
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.tracing_memory = enabled
+
+    def memory_start(self):
+        """returns the traced memory before an outermost call (None when tracing is off).
+        The peak is only reset when no other outermost call is running, so theirs is kept"""
+        if not self.tracing_memory:
+            return None
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return None
+        with self.lock:
+            if self.memory_calls == 0:
+                tracemalloc.reset_peak()
+            self.memory_calls += 1
+        return tracemalloc.get_traced_memory()[0]
+
+    def memory_peak(self, before):
+        """returns how far the traced memory rose above its level before a call.
+        Calls running at the same time in other threads are counted too"""
+        if before is None:
+            return 0
+        import tracemalloc
+        with self.lock:
+            self.memory_calls -= 1
+        if not tracemalloc.is_tracing():
+            return 0
+        return max(tracemalloc.get_traced_memory()[1] - before, 0)
+
+    def memory_top(self, limit=10):
+        """returns the source lines holding the most traced memory"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return [{'line': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:limit]]
+
+    # ========== reading the statistics ==========
+
+    def snapshot(self):
+        """returns all statistics as plain values"""
+        with self.lock:
+            records = {name: record.as_dict() for name, record in sorted(self.records.items())}
+        return {
+            'started': self.started,
+            'seconds': round(time.time() - self.started, 3),
+            'profiling': self.profiling,
+            'tracing_memory': self.tracing_memory,
+            'records': records,
+            'watched': {name: stats() for name, stats in self.watched.items()},
+            'profile': self.profile_top(),
+            'memory': self.memory_top() if self.tracing_memory else [],
+        }
+
+    def summary(self):
+        """returns the statistics as a text table, slowest total time first"""
+        snapshot = self.snapshot()
+        records = snapshot['records']
+        lines = [f"{'name':<38}{'calls':>7}{'mean ms':>10}{'p95 ms':>9}{'max ms':>10}{'rows':>11}"]
+        for name, record in sorted(records.items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{name:<38}{record['calls']:>7}{record['mean_ms']:>10.1f}{record['p95_ms']:>9}"
+                         f"{record['max_ms']:>10.1f}{record['rows']:>11}")
+        for name, stats in snapshot['watched'].items():
+            lines.append('')
+            lines.append(f"{name}: " + ', '.join(f"{key} {value}" for key, value in stats.items()))
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """writes all statistics to a JSON file"""
+        with open(filename, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2, default=str)
+
+    def reset(self):
+        """forgets all statistics"""
+        with self.lock:
+            self.records = {}
+            self.profile_stats = None
+            self.started = time.time()
+
+
+def count_rows(result, args, rows=None):
+    """returns the rows processed by a call: rows(result, *args), or the length of the result"""
+    if rows is not None:
+        return int(rows(result, *args) or 0)
+    if hasattr(result, '__len__') and not isinstance(result, str):
+        return len(result)
+    return 0
+
+
+# one instrumentation shared by the whole application
+INSTRUMENTS = Instrumentation()
+timed = INSTRUMENTS.timed
+measure = INSTRUMENTS.measure
@@ -0,0 +1,142 @@
+"""
+This loader_module.py contains the loaders of the csv files: the client/product objects, the
+monthly targets and the report, built in memory, streamed, from shards or from SQLite.
+No GUI module is imported here, so the headless export can load the data without Tk.
+This module is imported to main.py and export.py.
+"""
+from client_module import Client
+from product_module import Product
+from instrument_module import timed
+
+# pandas, numpy and the order backends are imported inside the functions that use them,
+# so the GUI window shows up before they are loaded
+SOURCES = ["order_data.csv", "client_data.csv", "product_data.csv"]
+
+
+@timed()
+def read_file(filename):
+    """reads csv file and returns a pandas dataframe"""
+    from cache_module import load_table
+    return load_table(filename)
+
+
+@timed()
+def read_orders(filename):
+    """reads order csv file and returns a pandas dataframe in the order schema"""
+    from cache_module import load_table
+    from schema_module import parse_orders, SCHEMA_VERSION
+    return load_table(filename, parse_orders, SCHEMA_VERSION)
+
+
+def read_text_table(filename):
+    """parses csv file keeping every column as text (phone numbers keep their leading 0)"""
+    import pandas as pd
+    return pd.read_csv(filename, dtype=str, keep_default_na=False)
+
+
+@timed()
+def read_client(filename):
+    """Reads client csv file and returns a list of client objects"""
+    from cache_module import load_table
+    content = load_table(filename, read_text_table)
+    client_list = []
+    for line in content.itertuples(index=False, name=None):
+        client_id,store_name,owner,phone,email,province = line
+        # create a list of client objects belong to Client class:
+        client = Client(client_id, store_name, phone, province)
+        client_list.append(client)
+    return client_list
+
+
+@timed()
+def read_product(filename):
+    """reads product csv file and returns a list of product objects"""
+    from cache_module import load_table
+    content = load_table(filename, read_text_table)
+    product_list = []
+    for line in content.itertuples(index=False, name=None):
+        product_id, category, name,specification,unit,price = line
+        # create a list of product objects belong to Product class:
+        product = Product(product_id, category, name, specification, unit, float(price))
+        product_list.append(product)
+    return product_list
+
+
+
+@timed(rows=lambda report, *lists: len(report.orders))
+def load_report(client_list, product_list, monthly_target):
+    """loads order data into memory, creates the report and gives each client/product its orders"""
+    from report_module import Report
+    # turn order data csv file to pandas dataframe
+    order_data = read_orders("order_data.csv")
+    # create report object
+    report = Report(order_data, product_list, client_list, monthly_target, sources=SOURCES)
+    # Add order data into product/client objects and calculate their total overturns:
+    report.assign_orders()
+    return report
+
+
+@timed()
+def stream_report(client_list, product_list, monthly_target, chunksize):
+    """aggregates order data chunk by chunk and creates the report from the aggregates only"""
+    from report_module import Report
+    from cube_module import AggregateCube, CHUNK_SIZE
+    chunksize = chunksize or CHUNK_SIZE
+    cube = AggregateCube.load_or_build(
+        lambda: AggregateCube.stream("order_data.csv", product_list, client_list, chunksize), SOURCES,
+        mode='stream')
+    report = Report(None, product_list, client_list, monthly_target, cube=cube)
+    report.refresh_totals()
+    return report
+
+
+@timed()
+def shard_report(client_list, product_list, monthly_target, paths, workers, chunksize):
+    """aggregates the order files of every shard in parallel worker processes and creates
+    the report from the merged aggregates"""
+    from report_module import Report
+    from cube_module import AggregateCube, CHUNK_SIZE
+    from shard_module import shard_files, aggregate_shards
+    files = shard_files(paths)
+    cube = AggregateCube.load_or_build(
+        lambda: aggregate_shards(files, product_list, client_list, workers, chunksize or CHUNK_SIZE),
+        files + SOURCES[1:], mode='shards')
+    report = Report(None, product_list, client_list, monthly_target, cube=cube)
+    report.refresh_totals()
+    return report
+
+
+@timed()
+def sqlite_report(client_list, product_list, monthly_target, database, chunksize):
+    """opens the SQLite database of the csv files (importing them when they have changed)
+    and creates the report reading every figure from it"""
+    from report_module import Report
+    from sqlite_module import open_database, CHUNK_SIZE
+    backend = open_database(database, *SOURCES, chunksize=chunksize or CHUNK_SIZE)
+    report = Report(None, product_list, client_list, monthly_target, cube=backend)
+    report.refresh_totals()
+    return report
+
+
+@timed()
+def load_data(options):
+    """reads all csv files and returns the report (runs in the background)"""
+    # Read csv files and create lists of client/product objects:
+    client_list = read_client("client_data.csv")
+    product_list = read_product("product_data.csv")
+    # read Monthly Target csv file and convert to pandas dataframe
+    monthly_target = read_file("monthly_target.csv")
+    if getattr(options, 'shards', None):
+        report = shard_report(client_list, product_list, monthly_target, options.shards,
+                              getattr(options, 'shard_workers', None), options.chunksize)
+    elif getattr(options, 'backend', 'memory') == 'sqlite':
+        report = sqlite_report(client_list, product_list, monthly_target, getattr(options, 'database', None),
+                               options.chunksize)
+    elif options.stream:
+        report = stream_report(client_list, product_list, monthly_target, options.chunksize)
+    else:
+        report = load_report(client_list, product_list, monthly_target)
+    megabytes = getattr(options, 'chart_cache_mb', None)
+    report.cube.chart_cache.resize(getattr(options, 'chart_cache', None),
+                                   None if megabytes is None else int(megabytes * 2 ** 20))
+    return report
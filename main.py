@@ -12,102 +12,75 @@ good plan for next year.
 
 Requirements: you need 4 csv files: Client data, Product data, Order data and monthly target, and
 place it in the project folder (same with python main file).
+With many provinces, the orders of each province can be kept in their own csv file (same columns
+as order data) and loaded in parallel: python main.py --shards shards/
 
 You can open the program using Pycharm (Anaconda) or Wing IDE 101 or any Python IDE.
 """
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from prettytable import PrettyTable
-from client_module import Client
-from product_module import Product
-from report_module import Report
-from guimodule import SalesManagementGui
 import tkinter as tk
-
-
-def read_file(filename):
-    """reads csv file and returns a pandas dataframe"""
-    return pd.read_csv(filename)
-
-
-def read_client(filename):
-    """Reads client csv file and returns a list of client objects"""
-    infile = open(filename)
-    content = infile.read().splitlines()
-    infile.close()
-    lines = content[1:]
-    client_list = []
-    for line in lines:
-        client_id,store_name,owner,phone,email,province = line.split(",")
-        # create a list of client objects belong to Client class:
-        client = Client(client_id, store_name, phone, province)
-        client_list.append(client)
-    return client_list
-
-
-def read_product(filename):
-    """reads product csv file and returns a list of product objects"""
-    infile = open(filename)
-    content = infile.read().splitlines()
-    infile.close()
-    lines = content[1:]
-    product_list = []
-    for line in lines:
-        product_id, category, name,specification,unit,price = line.split(",")
-        # create a list of product objects belong to Product class:
-        product = Product(product_id, category, name, specification, unit, float(price))
-        product_list.append(product)
-    return product_list
-
-
-def return_object(object_list, id):
-    """takes an object list (client/product objects) and object ID, then returns an object"""
-    for object in object_list:
-        if object.id == id:
-            return object
+import argparse
+from guimodule import SalesManagementGui
+from instrument_module import INSTRUMENTS
+from loader_module import load_data
+
+
+def return_object(registry, id):
+    """takes a registry (client/product objects) and object ID, then returns an object"""
+    return registry.get(id)
+
+
+def parse_arguments():
+    """reads command line options"""
+    parser = argparse.ArgumentParser(description="Sales Management")
+    parser.add_argument("--stream", action="store_true",
+                        help="read order data in chunks instead of loading it all into memory")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="number of orders read at a time in streaming mode")
+    parser.add_argument("--shards", nargs="+", default=None, metavar="PATH",
+                        help="order csv files of each province (or folders of them) aggregated in parallel")
+    parser.add_argument("--shard-workers", type=int, default=None,
+                        help="worker processes aggregating the shards (default: one per core)")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="keep order data in memory (pandas) or in an indexed SQLite file")
+    parser.add_argument("--database", default=None,
+                        help="SQLite file of the sqlite backend (default: in the cache folder)")
+    parser.add_argument("--chart-cache", type=int, default=None,
+                        help="number of client/product charts whose data is kept in memory")
+    parser.add_argument("--chart-cache-mb", type=float, default=None,
+                        help="memory limit (MB) of the cached chart data")
+    parser.add_argument("--profile", action="store_true",
+                        help="capture cProfile statistics of the timed calls from the start")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace memory allocations (tracemalloc) from the start")
+    return parser.parse_args()
 
 
 def main():
     """main function"""
-    # Read csv files and create lists of client/product objects:
-    client_list = read_client("client_data.csv")
-    product_list = read_product("product_data.csv")
-    # turn order data csv file to pandas dataframe
-    order_data = read_file("order_data.csv")
-    # read Monthly Target csv file and convert to pandas dataframe
-    monthly_target = read_file("monthly_target.csv")
-    # create report object
-    report = Report(order_data, product_list, client_list, monthly_target)
-
-    # Add order data into product object and calculate the total overturns of each product object:
-    for product in product_list:
-        product.add_order(order_data)
-        product.total_overturn()
-
-    # Add order data into client object and calculate the total overturns of each client object:
-    for client in client_list:
-        client.add_order(order_data)
-        client.total_overturn()
-
-    # Create window tkinter object
+    options = parse_arguments()
+    INSTRUMENTS.set_profiling(options.profile)
+    if options.trace_memory:
+        INSTRUMENTS.set_memory_tracing(True)
 
+    # Create window tkinter object first, then load the data behind it
     window = tk.Tk()
     window.title("Student: Giang Bui - ID: 37306207")
-    salesgui = SalesManagementGui(window, client_list, product_list, order_data, report)
+    salesgui = SalesManagementGui(window)
+    salesgui.runner.submit('load', lambda: load_data(options), salesgui.attach_report, salesgui.show_error)
     window.mainloop()
 
 
-main()
-# product_1 = return_object(product_list, "NPK012")
+if __name__ == "__main__":
+    main()
+# product_1 = return_object(report.products, "NPK012")
 # print(product_1.total)
 # product_1.print_product_details()
-# product_1.plot_top_5_clients()
-# product_1.plot_monthly_total()
-# client_1 = return_object(client_list, "NT024")
+# product_1.plot_top_5_clients(report.cube)
+# product_1.plot_monthly_total(report.cube)
+# client_1 = return_object(report.clients, "NT024")
 # client_1.print_client_details()
-# client_1.plot_top_5_products()
-# client_1.plot_monthly_total()
+# client_1.plot_top_5_products(report.cube)
+# client_1.plot_monthly_total(report.cube)
 
 # report.category_revenue()
 # report.plot_category_revenue()
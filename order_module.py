@@ -0,0 +1,55 @@
+"""
+This order_module.py contains OrderPartition class, which splits the order data by one key column
+(Client ID or Product ID) in a single pass.
+This module is imported to report_module.py.
+"""
+import numpy as np
+import pandas as pd
+from schema_module import to_money
+
+
+class OrderPartition:
+    """define order partition class"""
+    def __init__(self, order_data, key):
+        """Sorts the order data once by key and records the row range and total of every key value"""
+        self.key = key
+        codes, keys = pd.factorize(order_data[key])
+        position = np.argsort(codes, kind='stable')
+        # one sorted copy is shared by every client/product, each one only keeps its row range
+        self.orders = order_data.take(position)
+        counts = np.bincount(codes, minlength=len(keys))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        totals = np.add.reduceat(self.orders['Total'].values, bounds[:-1]) if len(keys) else []
+        # orders appended after the partition was built, kept apart from the sorted orders
+        self.extra_orders = []
+        self.ranges = {}
+        self.totals = {}
+        for i, key_value in enumerate(keys):
+            self.ranges[key_value] = (int(bounds[i]), int(bounds[i + 1]))
+            self.totals[key_value] = totals[i]
+
+    def row_range(self, key_value):
+        """returns the (start, stop) rows of a key value inside the sorted order data"""
+        return self.ranges.get(key_value, (0, 0))
+
+    def rows(self, key_value):
+        """returns the orders of a key value as a slice of the sorted order data"""
+        start, stop = self.row_range(key_value)
+        rows = self.orders.iloc[start:stop]
+        if self.extra_orders:
+            extra = [orders[orders[self.key] == key_value] for orders in self.extra_orders]
+            rows = pd.concat([rows] + extra)
+        return rows
+
+    def append(self, new_orders):
+        """adds new orders and updates the totals of their key values only,
+        returns the key values that changed"""
+        self.extra_orders.append(new_orders)
+        sums = new_orders.groupby(self.key, observed=True)['Total'].sum()
+        for key_value, total in sums.items():
+            self.totals[key_value] = self.totals.get(key_value, 0) + total
+        return sums.index.tolist()
+
+    def total(self, key_value):
+        """returns the precomputed total overturn (NZD) of a key value"""
+        return to_money(self.totals.get(key_value, 0))
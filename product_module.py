@@ -1,17 +1,19 @@
 """
 This client_module.py contains Product class, which is the blueprint for create product object.
-This module is imported to main.py, report_module.py and guimodule.py.
+This module is imported to loader_module.py.
 """
 
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from prettytable import PrettyTable
+from chart_module import WindowChart, month_labels
+from instrument_module import timed
+from table_module import Table
 
 
 class Product:
     """Creates a new product with the product ID, category, name,
     specification, unit and price attributes"""
+    # no per-object __dict__: a product is a few references, its orders stay in the shared partition
+    __slots__ = ('id', 'category', 'name', 'spec', 'unit', 'price', 'order_partition', 'total')
+
     def __init__(self, product_id, category, name,specification,unit,price):
         self.id = product_id
         self.category = category
@@ -19,79 +21,79 @@ class Product:
         self.spec = specification
         self.unit = unit
         self.price = price
-        self.orders = []
+        self.order_partition = None
         self.total = 0
 
+    def details(self):
+        """returns (field, value) pairs of product's details"""
+        return [("Product's ID", self.id), ("Category", self.category), ("Name", self.name),
+                ("Unit", self.unit), ("Price (NZD)", self.price), ("Total Amount (NZD)", self.total)]
+
     def product_details(self):
         """organises and returns a table of product's details"""
-        table = PrettyTable()
-        table.field_names = ["Product Details"]
-        table.add_row([f"Product's ID: {self.id}"])
-        table.add_row([f"Category: {self.category}"])
-        table.add_row([f"Name: {self.name}"])
-        table.add_row([f"Unit: {self.unit}"])
-        table.add_row([f"Price (NZD): {self.price}"])
-        table.add_row(([f"Total Amount (NZD): {self.total}"]))
-        return table
-
-    def add_order(self, order_data):
-        """fetches all orders of product object from order data and returns order data
-        for the product"""
-        self.orders = order_data.loc[order_data['Product ID'] == self.id, :]
+        return Table(["Product Details"], [[f"{field}: {value}"] for field, value in self.details()])
+
+    def add_order(self, product_orders):
+        """links the product object to the order partition grouped by Product ID"""
+        self.order_partition = product_orders
+
+    @property
+    def order_range(self):
+        """returns the (start, stop) rows of the product's orders in the sorted order data"""
+        if self.order_partition is None:
+            return (0, 0)
+        return self.order_partition.row_range(self.id)
+
+    @property
+    def orders(self):
+        """returns all orders of the product object, read from the order partition when asked for"""
+        if self.order_partition is None:
+            return []
+        return self.order_partition.rows(self.id)
 
     def total_overturn(self):
-        """calculates total overturn of product object"""
-        product_data = self.orders[self.orders['Product ID'] == self.id]
-        self.total = np.sum(product_data['Total'].values)
-
-    def plot_top_5_clients(self):
+        """reads total overturn of product object from the order partition"""
+        self.total = self.order_partition.total(self.id)
+
+    @timed()
+    def top_5_clients(self, cube):
+        """returns units of the 5 clients buying the product most"""
+        from topk_module import top_k
+        return cube.cached(('product', self.id, 'top 5'),
+                           lambda: top_k(cube, 'client', 'quantity', 5, product=self.id))
+
+    @timed()
+    def monthly_total(self, cube, start=None, end=None, year=None):
+        """returns product overturn in each month of a year (the latest by default),
+        or in each month from start to end date when both are given"""
+        if start is not None and end is not None:
+            return cube.cached(('product', self.id, 'monthly', start, end),
+                               lambda: cube.between(start, end, 'Product ID', self.id))
+        return cube.cached(('product', self.id, 'monthly', year),
+                           lambda: cube.monthly('Product ID', self.id, year=year))
+
+    @timed()
+    def plot_top_5_clients(self, cube, top5_data=None, chart=None):
         """Plot top 5 best-sellers for the product"""
-        product_data = self.orders[self.orders['Product ID'] == self.id]
         # Plot Top 5 Clients buying this product:
-        top5_data = product_data[["Client ID", "Quantity"]]
-        top5_data = top5_data.groupby(['Client ID'], as_index=False).sum().sort_values(by='Quantity',
-                                                                                       ascending=False).head()
-        axes = plt.axes()
-        xs = top5_data['Client ID'].tolist()
-        ys = top5_data['Quantity'].tolist()
-        axes.bar(xs, ys, color='orange')
-        axes.set_title(f"Top 5 Best-Buyers Of Product {self.id}")
-        axes.set_xlabel("Clients")
-        axes.set_ylabel("Units")
-        axes.grid(True)
-        plt.show()
-
-    def plot_monthly_total(self):
+        if top5_data is None:
+            top5_data = self.top_5_clients(cube)
+        chart = chart or WindowChart()
+        xs = top5_data.index.tolist()
+        ys = top5_data.tolist()
+        chart.bar('product top 5', xs, ys, color='orange',
+                  title=f"Top 5 Best-Buyers Of Product {self.id}",
+                  xlabel="Clients", ylabel="Units")
+
+    @timed()
+    def plot_monthly_total(self, cube, monthly_total=None, chart=None):
         """plot monthly total for the product object"""
-        product_data = self.orders[self.orders['Product ID'] == self.id]
-        product_data = product_data[['Date', 'Total']]
-        product_data['Date'] = pd.to_datetime(product_data.Date)
-        monthly_total = product_data.groupby(product_data.Date.dt.month)['Total'].sum()
-        month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        month_empty = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0, 11: 0, 12: 0}
-        month_values = monthly_total.to_dict()
-        month_dict = {**month_empty, **month_values}
-        months = list(month_dict.keys())
-        totals = list(month_dict.values())
+        if monthly_total is None:
+            monthly_total = self.monthly_total(cube)
         # plot bar chart:
-        axes = plt.axes()
-        xs = months
-        ys = totals
-        axes.bar(xs, ys, color='green')
-        axes.set_title(f"Monthly Revenue of {self.id}")
-        axes.set_xlabel("Month")
-        axes.set_ylabel("NZD")
-        axes.set_xticks(range(1, 13))
-        axes.set_xticklabels(month_labels)
-        axes.grid(True)
-        plt.show()
-
-
-
-
-
-
-
-
-
-
+        chart = chart or WindowChart()
+        xs = monthly_total.index.tolist()
+        ys = monthly_total.tolist()
+        chart.bar('product monthly', xs, ys, color='green',
+                  title=f"Monthly Revenue of {self.id}",
+                  xlabel="Month", ylabel="NZD", xticklabels=month_labels(xs))
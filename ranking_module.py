@@ -0,0 +1,63 @@
+"""
+This ranking_module.py contains RevenueIndex class, which keeps client totals sorted so that
+threshold, top-N and percentile queries only need a binary search.
+This module is imported to report_module.py.
+"""
+from bisect import bisect_left, insort
+
+
+class RevenueIndex:
+    """define revenue index class"""
+    def __init__(self, client_list):
+        """Creates a sorted index of (total, client ID) over all clients, and one per province"""
+        self.totals = {}
+        self.province_of = {}
+        self.entries = []
+        self.provinces = {}
+        for client in client_list:
+            self.totals[client.id] = client.total
+            self.province_of[client.id] = client.province
+            self.entries.append((client.total, client.id))
+            self.provinces.setdefault(client.province, []).append((client.total, client.id))
+        self.entries.sort()
+        for entries in self.provinces.values():
+            entries.sort()
+
+    def sorted_entries(self, province=None):
+        """returns the ascending (total, client ID) list of all clients or of one province"""
+        if province is None:
+            return self.entries
+        return self.provinces.get(province, [])
+
+    def update(self, client_id, total):
+        """moves a client to its new total"""
+        province = self.province_of.get(client_id)
+        old_total = self.totals.get(client_id)
+        for entries in [self.entries, self.provinces.setdefault(province, [])]:
+            if old_total is not None:
+                position = bisect_left(entries, (old_total, client_id))
+                if position < len(entries) and entries[position] == (old_total, client_id):
+                    del entries[position]
+            insort(entries, (total, client_id))
+        self.totals[client_id] = total
+
+    def above(self, threshold, province=None):
+        """returns (client ID, total) of clients with total >= threshold, highest first"""
+        entries = self.sorted_entries(province)
+        position = bisect_left(entries, (threshold,))
+        return [(client_id, total) for total, client_id in reversed(entries[position:])]
+
+    def top(self, number, threshold=None, province=None):
+        """returns (client ID, total) of the best clients, at most number of them and all >= threshold"""
+        entries = self.sorted_entries(province)
+        start = max(len(entries) - number, 0)
+        if threshold is not None:
+            start = max(start, bisect_left(entries, (threshold,)))
+        return [(client_id, total) for total, client_id in reversed(entries[start:])]
+
+    def percentile_rank(self, client_id, province=None):
+        """returns the percentage of clients (of the province) with a lower total than the client"""
+        entries = self.sorted_entries(province)
+        if client_id not in self.totals or not entries:
+            return None
+        return 100.0 * bisect_left(entries, (self.totals[client_id],)) / len(entries)
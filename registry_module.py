@@ -0,0 +1,59 @@
+"""
+This registry_module.py contains Registry class, which indexes client/product objects by their ID.
+This module is imported to report_module.py.
+"""
+import threading
+from search_module import PrefixIndex
+
+
+class Registry:
+    """define registry class"""
+    def __init__(self, object_list):
+        """Creates a registry from a list of client/product objects"""
+        self.objects = {}
+        for item in object_list:
+            self.objects[item.id] = item
+        # search-as-you-type index of IDs and names, built once (in the background by the GUI)
+        self.index = None
+        self.index_lock = threading.Lock()
+
+    def __contains__(self, object_id):
+        """checks whether an ID is in the registry"""
+        return object_id in self.objects
+
+    def __iter__(self):
+        """iterates over client/product objects in their original order"""
+        return iter(self.objects.values())
+
+    def __len__(self):
+        """returns number of objects in the registry"""
+        return len(self.objects)
+
+    def get(self, object_id):
+        """returns the object of an ID, or None if the ID is unknown"""
+        return self.objects.get(object_id)
+
+    def ids(self):
+        """returns list of IDs in the original order"""
+        return list(self.objects)
+
+    def search(self, prefix, limit=None):
+        """returns the IDs whose ID or name starts with prefix, ID matches first (see PrefixIndex)"""
+        return self.prefix_index().search(prefix, len(self.objects) if limit is None else limit)
+
+    def prefix_index(self):
+        """returns the prefix index of IDs and names, building it on the first call
+        (one thread builds it, the others wait for it)"""
+        if self.index is None:
+            with self.index_lock:
+                if self.index is None:
+                    self.index = PrefixIndex((item.id, item.name) for item in self.objects.values())
+        return self.index
+
+    def suggest(self, text, limit=10):
+        """returns (ID, name) of the objects whose ID or name starts with text, or nothing while
+        the index is not built yet: a keystroke never waits for the build"""
+        index = self.index
+        if index is None:
+            return []
+        return index.suggest(text, limit)
@@ -1,65 +1,158 @@
 
 """
 This report_module.py contains Report class, which is the blueprint for create report object.
-This module is imported to main.py, guimodule.py.
+This module is imported to loader_module.py.
 This class will build several methods including:
 - Calculating total Revenue
+- Building the aggregate cube that every report and plot reads from
+- Adding batches of new orders without reloading the order data
 - Plotting Category revenue (pie chart)
 - Plotting Province revenue (pie chart)
-- Plotting Monthly revenue (plot bar chart)
+- Plotting Monthly revenue of a year or of a date range (plot bar chart)
+- Comparing revenue year over year against the targets of each year
+- Forecasting the rest of the year of every client/product/category/province against the targets
+- Cross-selling: similar products, and products suggested for a client (co-purchase matrix)
 - Plotting Top 10 Clients (plot bar chart)
 - Plotting Top 10 Products (plot bar chart)
 - Calculating VIP Clients whose revenue >= threshold
 - Calculating months meet target (monthly target csv file) and plotting the result
 """
 import pandas as pd
-import matplotlib.pyplot as plt
-from prettytable import PrettyTable
+from chart_module import WindowChart, MONTH_LABELS, month_labels, pie_colors
+from topk_module import top_k
+from forecast_module import forecast, METHODS
+from copurchase_module import CoPurchaseMatrix
+from registry_module import Registry
+from cube_module import AggregateCube, label
+from order_module import OrderPartition
+from schema_module import parse_orders, to_money
+from ranking_module import RevenueIndex
+from instrument_module import timed
+from table_module import Table, format_text
+from timestore_module import TimePartitionedStore
 
 
 class Report:
     """Define Report Class"""
-    def __init__(self, order_data, product_list, client_list, monthly_target):
+    def __init__(self, order_data, product_list, client_list, monthly_target, sources=None, cube=None):
         self.orders = order_data
         self.product_list = product_list
         self.client_list = client_list
-        self.total = sum(order_data['Total'])
-        self.category_total = {"NPK": 0, "Foliar Fertilizer": 0, "Organic": 0}
-        self.province_total = {"Ninh Thuan": 0, "Khanh Hoa": 0}
+        self.products = Registry(product_list)
+        self.clients = Registry(client_list)
+        # sources: csv files the cube is built from, used to reuse the cube stored on disk
+        # cube: the order backend when it is not built from order_data here: an already
+        # aggregated cube (streaming mode) or a SQLite backend, order_data is then None
+        if cube is None:
+            cube = AggregateCube.load_or_build(
+                lambda: AggregateCube.build(order_data, product_list, client_list), sources)
+        self.cube = cube
+        # orders partitioned by year-month for exact date ranges, only when order data is in memory
+        self.store = None
+        if order_data is not None:
+            self.store = TimePartitionedStore(order_data)
+            self.cube.store = self.store
+        self.categories, self.provinces = AggregateCube.dimension_maps(product_list, client_list)
+        # order partitions by Client ID and Product ID, only when order data is in memory
+        self.client_orders = None
+        self.product_orders = None
+        # client totals sorted by revenue, built once the totals are known
+        self.revenue_index = None
+        # client x product matrix of the cross-sell queries, built on the first query
+        self.copurchase = None
+        self.total = self.cube.total()
+        # revenue of every category/province found in the data, set by category/province_revenue
+        self.category_total = {}
+        self.province_total = {}
         self.target = monthly_target
 
+    @property
+    def version(self):
+        """data version, goes up every time new orders are added"""
+        return self.cube.version
+
     def client_id_list(self):
         """gets list of client's IDs"""
-        client_ids = []
-        for client in self.client_list:
-            client_ids.append(client.id)
-        return client_ids
+        return self.clients.ids()
 
     def product_id_list(self):
         """gets list of product's IDs"""
-        product_ids = []
+        return self.products.ids()
+
+    @timed(rows=lambda result, report: len(report.orders))
+    def assign_orders(self):
+        """groups order data once by product ID and client ID, then gives every
+        product/client object its orders and total overturn"""
+        self.product_orders = OrderPartition(self.orders, 'Product ID')
+        self.client_orders = OrderPartition(self.orders, 'Client ID')
         for product in self.product_list:
-            product_ids.append(product.id)
-        return product_ids
+            product.add_order(self.product_orders)
+            product.total_overturn()
+        for client in self.client_list:
+            client.add_order(self.client_orders)
+            client.total_overturn()
+        self.revenue_index = RevenueIndex(self.client_list)
 
-    def category_revenue(self):
-        """Calculates total revenue for each product's category"""
+    @timed(rows=lambda added, report, new_orders: added)
+    def append_orders(self, new_orders):
+        """adds a batch of new orders (order schema) and updates only the clients, products
+        and aggregates they touch, returns the number of orders added"""
+        if len(new_orders) == 0:
+            return 0
+        # the store first: the cube version changes last, once every part has the new orders
+        if self.store is not None:
+            self.store.append(new_orders)
+        self.cube.add_orders(new_orders, self.categories, self.provinces)
+        if self.copurchase is not None:
+            self.copurchase.add_orders(new_orders)
+        self.total += to_money(new_orders['Total'].sum())
+        for registry, partition, key in [(self.clients, self.client_orders, 'Client ID'),
+                                         (self.products, self.product_orders, 'Product ID')]:
+            if partition is not None:
+                changed_ids = partition.append(new_orders)
+            else:
+                changed_ids = new_orders[key].unique().tolist()
+                # only the IDs of the batch, not a rollup of every order
+                totals = self.cube.totals(key, changed_ids)
+            for object_id in changed_ids:
+                entity = registry.get(object_id)
+                if entity is None:
+                    continue
+                if partition is not None:
+                    entity.add_order(partition)
+                    entity.total_overturn()
+                else:
+                    entity.total = totals.get(object_id, 0)
+                if key == 'Client ID' and self.revenue_index is not None:
+                    self.revenue_index.update(object_id, entity.total)
+        return len(new_orders)
+
+    @timed()
+    def append_order_file(self, filename):
+        """reads a csv file of new orders and adds them to the report"""
+        return self.append_orders(parse_orders(filename))
+
+    @timed()
+    def refresh_totals(self):
+        """sets the total overturn of every client and product object from the cube"""
+        client_totals = self.cube.rollup('Client ID')
+        for client in self.client_list:
+            client.total = client_totals.get(client.id, 0)
+        product_totals = self.cube.rollup('Product ID')
         for product in self.product_list:
-            if product.category == "NPK":
-                self.category_total["NPK"] += product.total
-            if product.category == "foliar fertilizer":
-                self.category_total["Foliar Fertilizer"] += product.total
-            if product.category == "Organic":
-                self.category_total["Organic"] += product.total
+            product.total = product_totals.get(product.id, 0)
+        self.revenue_index = RevenueIndex(self.client_list)
+
+    @timed()
+    def category_revenue(self):
+        """returns total revenue for each product's category"""
+        self.category_total = self.cube.rollup('Category').to_dict()
         return self.category_total
 
+    @timed()
     def province_revenue(self):
-        """calculates total revenue for each province"""
-        for client in self.client_list:
-            if client.province == "Ninh Thuan":
-                self.province_total["Ninh Thuan"] += client.total
-            if client.province == "Khanh Hoa":
-                self.province_total["Khanh Hoa"] += client.total
+        """returns total revenue for each province"""
+        self.province_total = self.cube.rollup('Province').to_dict()
         return self.province_total
 
     def autopct_format(self, values):
@@ -70,105 +163,252 @@ class Report:
             return '{:.1f}%\n({v:d} NZD)'.format(pct, v=value)
         return special_format
 
-    def plot_category_revenue(self):
-        """Plots bar chart for category revenues"""
-        labels = []
-        total_amount = []
-        colors = ['#ff9999', '#66b3ff', '#99ff99']
-        for category, total in self.category_total.items():
-            labels.append(category)
-            total_amount.append(total)
+    @timed()
+    def plot_category_revenue(self, category_total=None, chart=None):
+        """Plots pie chart for category revenues"""
+        if category_total is None:
+            category_total = self.category_revenue()
+        labels = list(category_total.keys())
+        total_amount = list(category_total.values())
         # Plot
-        axes = plt.axes()
-        plt.pie(total_amount, labels=labels, colors=colors, shadow=True, autopct=self.autopct_format(total_amount))
-        axes.set_title("TOTAL REVENUE IN CATEGORIES")
-        plt.show()
+        chart = chart or WindowChart()
+        chart.pie('category', total_amount, labels, pie_colors(len(labels)), title="TOTAL REVENUE IN CATEGORIES",
+                  autopct=self.autopct_format(total_amount))
 
-    def plot_province_revenue(self):
+    @timed()
+    def plot_province_revenue(self, province_total=None, chart=None):
         """plots piechart based on province total revenue"""
-        labels = []
-        total_amount = []
-        colors = ['#ff9999', '#66b3ff']
-        for province, total in self.province_total.items():
-            labels.append(province)
-            total_amount.append(total)
+        if province_total is None:
+            province_total = self.province_revenue()
+        labels = list(province_total.keys())
+        total_amount = list(province_total.values())
         # Plot
-        axes = plt.axes()
-        plt.pie(total_amount, labels=labels, colors=colors, shadow=True, autopct=self.autopct_format(total_amount))
-        axes.set_title("TOTAL REVENUE IN PROVINCES")
-        plt.show()
+        chart = chart or WindowChart()
+        chart.pie('province', total_amount, labels, pie_colors(len(labels)), title="TOTAL REVENUE IN PROVINCES",
+                  autopct=self.autopct_format(total_amount))
+
+    @timed()
+    def monthly_revenue(self, start=None, end=None, year=None):
+        """returns total revenue in each month of a year (the latest by default),
+        or in each month from start to end date when both are given"""
+        if start is not None and end is not None:
+            return self.cube.between(start, end)
+        return self.cube.monthly(year=year)
 
-    def plot_monthly_revenue(self):
+    def targets_for(self, year):
+        """returns the target of each month (1 to 12) of a year; a target file without
+        a Year column holds the same targets for every year"""
+        targets = self.target
+        if 'Year' in targets.columns:
+            targets = targets[targets['Year'] == year]
+        if 'Month' not in targets.columns:
+            return targets['Target'].reset_index(drop=True).set_axis(range(1, len(targets) + 1))
+        return targets.set_index('Month')['Target'].reindex(range(1, 13), fill_value=0)
+
+    def monthly_targets(self, months, year=None):
+        """returns the targets matching the months of a monthly revenue series"""
+        targets = []
+        for month in months:
+            if hasattr(month, 'year'):
+                targets.append(self.targets_for(month.year).get(month.month, 0))
+            else:
+                targets.append(self.targets_for(year).get(month, 0))
+        return targets
+
+    @timed()
+    def plot_monthly_revenue(self, monthly_total=None, chart=None, year=None):
         """plots bar chart for monthly revenue"""
-        data = self.orders[['Date', 'Total']]
-        data['Date'] = pd.to_datetime(data.Date)
-        monthly_total = data.groupby(data.Date.dt.month)['Total'].sum()
-        month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'July', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        month_empty = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0, 11: 0, 12: 0}
-        month_values = monthly_total.to_dict()
-        month_dict = {**month_empty, **month_values}
-        months = list(month_dict.keys())
-        totals = list(month_dict.values())
-        targets = self.target['Target'].to_list()
+        if monthly_total is None:
+            monthly_total = self.monthly_revenue(year=year)
+        xs = monthly_total.index.tolist()
+        if year is None:
+            year = self.cube.latest_year()
+        targets = self.monthly_targets(xs, year)
+        if xs and hasattr(xs[0], 'year'):
+            title = "Total Revenue From {} To {}".format(*month_labels([xs[0], xs[-1]]))
+        else:
+            title = f"Total Revenue In {year}"
         # plot bar chart:
-        axes = plt.axes()
-        xs = months
-        ys2 = targets
-        ys = totals
-        axes.bar(xs, ys, color='blue', label="Reality")
-        axes.plot(xs, ys2,'ro-', color='orange', label="Target")
-        axes.set_title(f"Total Revenue In 12 Months", color='#333333')
-        axes.set_xlabel("Month", color='#333333')
-        axes.set_ylabel("NZD", color='#333333')
-        axes.set_xticks(range(1, 13))
-        axes.set_xticklabels(month_labels)
-        axes.legend(loc='best')
-        axes.grid(False)
-        plt.show()
-
-    def plot_top_10_clients(self):
+        chart = chart or WindowChart()
+        ys = monthly_total.tolist()
+        chart.bar('monthly', xs, ys, color='blue', bar_label="Reality",
+                  lines=[(targets, 'orange', "Target")],
+                  title=title, xlabel="Month", ylabel="NZD",
+                  xticklabels=month_labels(xs), grid=False)
+
+    @timed()
+    def year_over_year(self):
+        """returns a table of revenue by month (rows) and year (columns), with the
+        targets of each year and the growth (%) of each year over the year before"""
+        years = self.cube.years()
+        table = {}
+        for year in years:
+            table[year] = self.cube.monthly(year=year)
+            table[f'{year} Target'] = self.targets_for(year).to_numpy()
+        for previous, year in zip(years, years[1:]):
+            before = table[previous].replace(0, float('nan'))
+            table[f'{year} Growth %'] = ((table[year] - before) / before * 100).round(1)
+        return pd.DataFrame(table, index=range(1, 13))
+
+    @timed()
+    def plot_year_over_year(self, comparison=None, chart=None):
+        """plots the revenue of the latest year as bars, with the year before and the targets as lines"""
+        if comparison is None:
+            comparison = self.year_over_year()
+        years = [column for column in comparison.columns if isinstance(column, int)]
+        latest = years[-1]
+        lines = [(comparison[f'{latest} Target'].tolist(), 'orange', f"Target {latest}")]
+        if len(years) > 1:
+            lines.insert(0, (comparison[years[-2]].tolist(), 'grey', str(years[-2])))
+        chart = chart or WindowChart()
+        chart.bar('year over year', list(range(1, 13)), comparison[latest].tolist(), color='blue',
+                  bar_label=str(latest), lines=lines,
+                  title=f"Revenue {latest} Against {years[-2] if len(years) > 1 else 'Target'}",
+                  xlabel="Month", ylabel="NZD", xticklabels=MONTH_LABELS, grid=False)
+
+    @timed()
+    def forecast(self, dimension=None, method='linear trend', year=None, known=None):
+        """returns the projected year (latest by default) of every client/product/category/province
+        (everything together when dimension is None) against the targets, computed for all of them
+        at once and kept until new orders are added.
+        known: months of the year already known, by default up to the last month with orders"""
+        year = year or self.cube.latest_year()
+        return self.cube.cached(('forecast', dimension, method, year, known),
+                                lambda: forecast(self.cube, self.targets_for(year).to_numpy(), dimension,
+                                                 year, method, known))
+
+    def forecasts(self, year=None, known=None):
+        """returns the projected year of the whole company by every forecast method"""
+        return {method: self.forecast(None, method, year, known) for method in METHODS}
+
+    @timed()
+    def forecast_table(self, dimension='client', method='linear trend', year=None, known=None):
+        """returns a sortable table of the projected year of every entity of a dimension"""
+        projected = self.forecast(dimension, method, year, known)
+        return Table.from_columns({dimension.title(): projected.index.astype(str).tolist(),
+                                   "Actual": projected['Actual'].round(2).tolist(),
+                                   "Projected": projected['Projected'].round(2).tolist(),
+                                   "Target": projected['Target'].round(2).tolist(),
+                                   "Gap": projected['Gap'].round(2).tolist(),
+                                   "On Track": ['yes' if on_track else 'no' for on_track in projected['On Track']]},
+                                  align={"Actual": "r", "Projected": "r", "Target": "r", "Gap": "r"})
+
+    @timed()
+    def plot_forecast(self, forecasts=None, chart=None, year=None, known=None):
+        """plots the known months as bars and the projection of every method and the targets as lines"""
+        if forecasts is None:
+            forecasts = self.forecasts(year, known)
+        first = next(iter(forecasts.values()))
+        year, known = first.attrs['year'], first.attrs['known']
+        months = list(range(1, 13))
+        actual = [value if month <= known else 0 for month, value in zip(months, first.loc['All', months])]
+        colors = {'moving average': 'green', 'seasonal naive': 'grey', 'linear trend': 'red'}
+        lines = []
+        for method, projected in forecasts.items():
+            name = method.title()
+            if projected.attrs['fallback']:
+                # e.g. seasonal naive in the first year of data: the line is the moving average
+                name += f" (No {year - 1} Orders: Moving Average)"
+            lines.append((projected.loc['All', months].tolist(), colors.get(method, 'black'),
+                          f"{name} ({projected.loc['All', 'Projected']:,.0f})"))
+        lines.append((self.targets_for(year).tolist(), 'orange', f"Target ({first.loc['All', 'Target']:,.0f})"))
+        known_to = f"Known To {MONTH_LABELS[known - 1]}" if known else "Nothing Known Yet"
+        chart = chart or WindowChart()
+        chart.bar('forecast', months, actual, color='blue', bar_label="Reality", lines=lines,
+                  title=f"Forecast Of {year} ({known_to})", xlabel="Month", ylabel="NZD",
+                  xticklabels=MONTH_LABELS, grid=False)
+
+    @timed(rows=lambda matrix, report: len(matrix))
+    def co_purchase(self):
+        """returns the client x product co-purchase matrix, building it on the first call"""
+        with self.cube.lock:
+            if self.copurchase is None:
+                self.copurchase = CoPurchaseMatrix.build(self.cube)
+        return self.copurchase
+
+    @timed()
+    def similar_products(self, product_id, k=10):
+        """returns the products most often bought by the clients of a product"""
+        return self.co_purchase().similar_products(product_id, k)
+
+    @timed()
+    def suggested_products(self, client_id, k=10):
+        """returns the products bought by the clients most like a client, that it does not buy yet"""
+        return self.co_purchase().suggested_products(client_id, k)
+
+    def product_table(self, scores):
+        """returns a sortable table of products with their names, categories and scores"""
+        products = [self.products.get(product_id) for product_id in scores.index]
+        columns = {"Product ID": scores.index.astype(str).tolist(),
+                   "Name": [product.name if product else '' for product in products],
+                   "Category": [label(product.category) if product else '' for product in products]}
+        for name in scores.columns:
+            columns[name] = scores[name].tolist()
+        return Table.from_columns(columns, align={name: "r" for name in scores.columns})
+
+    @timed()
+    def similar_products_table(self, product_id, k=10):
+        """returns a table of the products most often bought together with a product"""
+        return self.product_table(self.similar_products(product_id, k))
+
+    @timed()
+    def suggested_products_table(self, client_id, k=10):
+        """returns a table of the products suggested for a client"""
+        return self.product_table(self.suggested_products(client_id, k))
+
+    @timed()
+    def top_10_clients(self, year=None):
+        """returns revenue of the 10 best clients of a year (the latest by default)"""
+        return top_k(self.cube, 'client', 'revenue', 10, year=year or self.cube.latest_year())
+
+    @timed()
+    def plot_top_10_clients(self, top10_data=None, chart=None, year=None):
         """Plots Top 10 Clients of the year:"""
-        data = self.orders[["Client ID", "Total"]]
-        top10_data = data.groupby(['Client ID'], as_index=False).sum().sort_values(by='Total',
-                                                                                       ascending=False).head(10)
-        axes = plt.axes()
-        xs = top10_data['Client ID'].tolist()
-        ys = top10_data['Total'].tolist()
-        axes.bar(xs, ys, color='orange')
-        axes.set_title(f"Top 10 Clients Of The Year")
-        axes.set_xlabel("Clients")
-        axes.set_ylabel("NZD")
-        axes.grid(True)
-        plt.show()
-
-    def plot_top_10_Products(self):
+        if top10_data is None:
+            top10_data = self.top_10_clients(year)
+        chart = chart or WindowChart()
+        xs = top10_data.index.tolist()
+        ys = top10_data.tolist()
+        chart.bar('top 10 clients', xs, ys, color='orange',
+                  title=f"Top 10 Clients Of {year or self.cube.latest_year()}",
+                  xlabel="Clients", ylabel="NZD")
+
+    @timed()
+    def top_10_products(self, year=None):
+        """returns revenue of the 10 best-selling products of a year (the latest by default)"""
+        return top_k(self.cube, 'product', 'revenue', 10, year=year or self.cube.latest_year())
+
+    @timed()
+    def plot_top_10_Products(self, top10_data=None, chart=None, year=None):
         """Plots Top 10 Products of the year:"""
-        data = self.orders[["Product ID", "Total"]]
-        top10_data = data.groupby(['Product ID'], as_index=False).sum().sort_values(by='Total',
-                                                                                       ascending=False).head(10)
-        axes = plt.axes()
-        xs = top10_data['Product ID'].tolist()
-        ys = top10_data['Total'].tolist()
-        axes.bar(xs, ys, color='orange')
-        axes.set_title(f"Top 10 Products Of The Year")
-        axes.set_xlabel("Products")
-        axes.set_ylabel("NZD")
-        axes.set_xticks(range(0, 10))
-        axes.set_xticklabels(xs, rotation=45)
-        axes.grid(True)
-        plt.show()
-
-    def print_diamond_clients(self, revenue_threshold):
-        """Returns a list of clients with revenue equal or more than threshold"""
-        table = PrettyTable()
-        table.field_names = ["Client ID", "Name", "Province", "Total Revenue"]
-        diamond_clients = []
-        for client in self.client_list:
-            if client.total >= revenue_threshold:
-                diamond_clients.append(client)
-        for client in diamond_clients:
-            table.add_row([client.id, client.name, client.province, client.total])
-        table.align["Total Revenue"] = "r"
-        return table
+        if top10_data is None:
+            top10_data = self.top_10_products(year)
+        chart = chart or WindowChart()
+        xs = top10_data.index.tolist()
+        ys = top10_data.tolist()
+        chart.bar('top 10 products', xs, ys, color='orange',
+                  title=f"Top 10 Products Of {year or self.cube.latest_year()}",
+                  xlabel="Products", ylabel="NZD", rotation=45)
+
+    @timed()
+    def diamond_clients(self, revenue_threshold, province=None):
+        """returns clients with revenue equal or more than threshold, highest revenue first"""
+        if self.revenue_index is None:
+            self.revenue_index = RevenueIndex(self.client_list)
+        return [self.clients.get(client_id)
+                for client_id, total in self.revenue_index.above(revenue_threshold, province)]
 
+    @timed()
+    def diamond_table(self, revenue_threshold, province=None):
+        """returns a sortable table of clients with revenue equal or more than threshold"""
+        clients = self.diamond_clients(revenue_threshold, province)
+        return Table.from_columns({"Client ID": [client.id for client in clients],
+                                   "Name": [client.name for client in clients],
+                                   "Province": [client.province for client in clients],
+                                   "Total Revenue": [client.total for client in clients]},
+                                  align={"Total Revenue": "r"})
 
+    @timed()
+    def print_diamond_clients(self, revenue_threshold, province=None):
+        """Returns a text table of clients with revenue equal or more than threshold"""
+        return format_text(self.diamond_table(revenue_threshold, province))
@@ -0,0 +1,60 @@
+"""
+This schema_module.py contains the load-time schema of the order data.
+Dates are parsed once with an explicit format, IDs become categoricals, money is stored as
+fixed-point integer cents (int64) and whole quantities use the smallest integer dtype that holds
+them. Fractional quantities stay float64: float32 would show 101.7 as 101.69999998807907.
+This module is imported to loader_module.py, order_module.py, cube_module.py, sqlite_module.py,
+report_module.py, timestore_module.py and copurchase_module.py.
+"""
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 2
+DATE_FORMAT = '%d/%m/%Y'
+MONEY_SCALE = 100
+MONEY_COLUMNS = ['Price', 'Total']
+ORDER_COLUMNS = ['ORDER ID', 'Client ID', 'Product ID', 'Date', 'Price', 'Quantity', 'Total']
+
+
+def to_cents(values):
+    """converts money values (NZD) to fixed-point integer cents"""
+    return np.round(np.asarray(values, dtype='float64') * MONEY_SCALE).astype('int64')
+
+
+def to_money(cents):
+    """converts fixed-point integer cents back to NZD"""
+    return cents / MONEY_SCALE
+
+
+def apply_order_schema(order_data):
+    """casts raw order data to the order schema and drops the empty trailing column"""
+    order_data = order_data[ORDER_COLUMNS]
+    quantity = pd.to_numeric(order_data['Quantity'])
+    if (quantity % 1 == 0).all():
+        quantity = pd.to_numeric(quantity, downcast='integer')
+    else:
+        # half units are sold, so quantities stay floating point (float64, so sums stay exact to print)
+        quantity = quantity.astype('float64')
+    return pd.DataFrame({
+        'ORDER ID': pd.to_numeric(order_data['ORDER ID'], downcast='unsigned'),
+        'Client ID': order_data['Client ID'].astype('category'),
+        'Product ID': order_data['Product ID'].astype('category'),
+        'Date': pd.to_datetime(order_data['Date'], format=DATE_FORMAT),
+        'Price': to_cents(order_data['Price']),
+        'Quantity': quantity,
+        'Total': to_cents(order_data['Total']),
+    })
+
+
+def parse_orders(filename):
+    """reads order csv file and returns it in the order schema"""
+    order_data = pd.read_csv(filename, thousands=',', dtype={'Client ID': str, 'Product ID': str})
+    return apply_order_schema(order_data)
+
+
+def read_order_chunks(filename, chunksize):
+    """reads order csv file chunksize rows at a time and yields each chunk in the order schema"""
+    chunks = pd.read_csv(filename, thousands=',', dtype={'Client ID': str, 'Product ID': str},
+                         chunksize=chunksize)
+    for chunk in chunks:
+        yield apply_order_schema(chunk)
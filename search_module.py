@@ -0,0 +1,56 @@
+"""
+This search_module.py contains PrefixIndex class, the search-as-you-type index of client/product
+IDs and names. Every ID and every word of a name (with the rest of the name after it) is a key of
+a sorted list, so the entries starting with what was typed are found with a binary search and
+read in order until enough are found, whatever the number of entities.
+This module is imported to registry_module.py.
+"""
+from bisect import bisect_left
+
+
+class PrefixIndex:
+    """define prefix index class"""
+    def __init__(self, entries):
+        """Creates the index from (ID, name) pairs"""
+        self.names = {}
+        id_keys = []
+        name_keys = []
+        for object_id, name in entries:
+            object_id, name = str(object_id), str(name)
+            self.names[object_id] = name
+            id_keys.append((object_id.lower(), object_id))
+            words = name.lower().split()
+            for position in range(len(words)):
+                name_keys.append((' '.join(words[position:]), object_id))
+        id_keys.sort()
+        name_keys.sort()
+        # keys and IDs in separate lists: bisect compares the keys only
+        self.id_keys = [key for key, object_id in id_keys]
+        self.id_values = [object_id for key, object_id in id_keys]
+        self.name_keys = [key for key, object_id in name_keys]
+        self.name_values = [object_id for key, object_id in name_keys]
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, text, limit=10):
+        """returns up to limit IDs whose ID or a word of whose name starts with text (any case),
+        ID matches first, each group in alphabetical order"""
+        prefix = ' '.join(str(text).lower().split())
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for keys, values in [(self.id_keys, self.id_values), (self.name_keys, self.name_values)]:
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and len(found) < limit and keys[position].startswith(prefix):
+                object_id = values[position]
+                if object_id not in seen:
+                    seen.add(object_id)
+                    found.append(object_id)
+                position += 1
+        return found
+
+    def suggest(self, text, limit=10):
+        """returns (ID, name) of the matches of search"""
+        return [(object_id, self.names[object_id]) for object_id in self.search(text, limit)]
@@ -0,0 +1,85 @@
+"""
+This shard_module.py contains the sharded loader: the orders of each province (or any other
+region) are kept in their own csv files, every file is read chunk by chunk and pre-aggregated
+into a fact table by a pool of worker processes, and the partial fact tables are merged into one
+aggregate cube. The fact tables hold everything the report needs from a shard: client and
+product totals, monthly sums, and the sums top-K selections are made from.
+The load time then depends on the biggest shard and the number of cores, not on the total data.
+This module is imported to loader_module.py.
+"""
+import glob
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from cube_module import AggregateCube, CHUNK_SIZE
+from instrument_module import INSTRUMENTS
+
+# category of each product ID and province of each client ID, set once in every worker process
+MAPS = None
+
+
+def shard_files(paths):
+    """returns the order csv files of the shards: files as given, every csv file of a folder"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.csv'))))
+        else:
+            files.append(path)
+    return files
+
+
+def start_worker(categories, provinces):
+    """gives a worker process the dimension maps once, instead of with every shard"""
+    global MAPS
+    MAPS = (categories, provinces)
+
+
+def aggregate_shard(filename, chunksize=CHUNK_SIZE):
+    """reads one shard and returns its fact table, number of orders and seconds taken"""
+    start = time.perf_counter()
+    facts, rows = AggregateCube.aggregate_file(filename, *MAPS, chunksize)
+    return facts, rows, time.perf_counter() - start
+
+
+def aggregate_shards(files, product_list, client_list, workers=None, chunksize=CHUNK_SIZE):
+    """returns the cube of the orders of all shard files, aggregated by a pool of worker processes
+    (in this process when there is one worker or one file)"""
+    categories, provinces = AggregateCube.dimension_maps(product_list, client_list)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    if workers == 1:
+        start_worker(categories, provinces)
+        results = [aggregate_shard(filename, chunksize) for filename in files]
+    else:
+        # forking is only safe while this process runs no other thread (the GUI loads in one)
+        forking = 'fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+        method = 'fork' if forking else 'spawn'
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                                 initializer=start_worker, initargs=(categories, provinces)) as pool:
+            results = list(pool.map(aggregate_shard, files, [chunksize] * len(files)))
+    for filename, (facts, rows, seconds) in zip(files, results):
+        INSTRUMENTS.record(f"shard.{os.path.splitext(os.path.basename(filename))[0]}", seconds, rows)
+    with INSTRUMENTS.measure('shard.merge') as counts:
+        facts = AggregateCube.merge([facts for facts, rows, seconds in results])
+        counts['rows'] = len(facts)
+    return AggregateCube(facts)
+
+
+def split_orders(order_file, client_file, folder, chunksize=CHUNK_SIZE):
+    """writes the orders of an order csv file into one csv file per province of their clients
+    (folder/<province>.csv), chunk by chunk; returns the files written"""
+    import pandas as pd
+    clients = pd.read_csv(client_file, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    province_of = dict(zip(clients.iloc[:, 0], clients.iloc[:, 5]))
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for chunk in pd.read_csv(order_file, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                             chunksize=chunksize):
+        provinces = chunk['Client ID'].map(province_of).fillna('unknown')
+        for province, orders in chunk.groupby(provinces, sort=False):
+            path = os.path.join(folder, province.strip().lower().replace(' ', '_') + '.csv')
+            orders.to_csv(path, mode='a' if path in written else 'w', header=path not in written, index=False)
+            written[path] = True
+    return sorted(written)
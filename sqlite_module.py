@@ -0,0 +1,376 @@
+"""
+This sqlite_module.py contains SQLiteBackend class, the order backend kept in an embedded SQLite
+file instead of memory, and ConnectionPool class, the connections its queries run on.
+Orders are indexed by (client, date), (product, date) and date, the indexes also hold the other ID,
+the total and quantity, so per client/product, top-K and monthly queries are indexed SQL
+aggregations that never read the order table itself. Money is stored as integer cents, dates as 'yyyy-mm-dd' text.
+import_csv bulk loads the csv files into a new database; open_database reuses the database until
+the csv files change. Orders appended while the programme runs last for the session, as in memory:
+open_database removes the orders appended after the import, so every backend reads the csv files.
+This module is imported to loader_module.py.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from backend_module import OrderBackend
+from cache_module import file_signature, cache_path
+from cube_module import MONTHS, CHUNK_SIZE, label
+from schema_module import MONEY_COLUMNS, SCHEMA_VERSION, to_money, read_order_chunks
+
+DATABASE_FILE = 'orders.sqlite'
+DATABASE_VERSION = 2
+# IDs looked up in one query (older SQLite versions allow 999 parameters)
+MAX_PARAMETERS = 500
+# one connection per background worker (BackgroundRunner runs 4)
+POOL_SIZE = 4
+
+TABLES = [
+    """CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)""",
+    """CREATE TABLE clients (client_id TEXT PRIMARY KEY, store_name TEXT, owner TEXT, phone TEXT,
+                             email TEXT, province TEXT)""",
+    """CREATE TABLE products (product_id TEXT PRIMARY KEY, category TEXT, name TEXT, spec TEXT,
+                              unit TEXT, price REAL)""",
+    """CREATE TABLE orders (order_id INTEGER, client_id TEXT, product_id TEXT, date TEXT,
+                            price INTEGER, quantity REAL, total INTEGER)""",
+]
+# created after the bulk import, so the rows are not indexed one at a time
+INDEXES = [
+    "CREATE INDEX orders_client ON orders (client_id, date, product_id, total, quantity)",
+    "CREATE INDEX orders_product ON orders (product_id, date, client_id, total, quantity)",
+    "CREATE INDEX orders_date ON orders (date, total, quantity)",
+]
+INSERT_ORDER = "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+# SQL expression of each cube dimension and measure
+COLUMNS = {
+    'Year': "CAST(substr(o.date, 1, 4) AS INTEGER)",
+    'Month': "CAST(substr(o.date, 6, 2) AS INTEGER)",
+    'Client ID': "o.client_id",
+    'Product ID': "o.product_id",
+    'Category': "p.category",
+    'Province': "c.province",
+}
+# names written as labels (see cube_module.label): grouped by the stored name, then relabelled
+LABELLED = {'Category', 'Province'}
+SUMS = {'Total': "SUM(o.total)", 'Quantity': "SUM(o.quantity)"}
+JOINS = {
+    'Category': "JOIN products p ON p.product_id = o.product_id",
+    'Province': "JOIN clients c ON c.client_id = o.client_id",
+}
+
+
+class ConnectionPool:
+    """define connection pool class"""
+    def __init__(self, database, size=POOL_SIZE):
+        """Creates an empty pool; up to size connections are opened when they are first needed"""
+        self.database = database
+        self.size = size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """forgets every connection (a forked process must open its own)"""
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.pid = os.getpid()
+
+    def connect(self):
+        """opens a connection usable from any thread, with the label() SQL function"""
+        connection = sqlite3.connect(self.database, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.create_function('label', 1, label, deterministic=True)
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """lends a connection for the block inside a with statement, waiting when all are in use"""
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = None
+                if self.opened < self.size:
+                    connection = self.connect()
+                    self.opened += 1
+        if connection is None:
+            connection = self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+    def close(self):
+        """closes the connections that are not in use"""
+        with self.lock:
+            while True:
+                try:
+                    self.idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self.opened -= 1
+
+
+class SQLiteBackend(OrderBackend):
+    """define SQLite backend class"""
+    def __init__(self, database, pool_size=POOL_SIZE):
+        """Opens an existing database file"""
+        super().__init__()
+        self.database = database
+        self.pool = ConnectionPool(database, pool_size)
+        # results of queries over all orders, forgotten when orders are appended
+        self.rollups = {}
+
+    def query(self, by=(), filters=(), measure='Total', months=None, dates=None, largest=None):
+        """returns the rows (group values..., sum) of the orders matching the filters, grouped by
+        the dimensions in by and sorted by them, or the largest sums first when largest is a count.
+        months: (first, last) month range; dates: (start, end) 'yyyy-mm-dd' range"""
+        joins = {JOINS[name] for name in list(by) + [name for name, value in filters] if name in JOINS}
+        where, parameters = [], []
+        if dates is not None:
+            where.append("o.date >= ? AND o.date <= ?")
+            parameters += list(dates)
+        for name, value in filters:
+            if name == 'Year':
+                # a date range, so the date part of the indexes is used
+                where.append("o.date >= ? AND o.date < ?")
+                parameters += [f"{int(value):04d}-01-01", f"{int(value) + 1:04d}-01-01"]
+            elif isinstance(value, (list, tuple)):
+                where.append(f"{COLUMNS[name]} IN ({', '.join('?' * len(value))})")
+                parameters += list(value)
+            elif name in LABELLED:
+                where.append(f"label({COLUMNS[name]}) = ?")
+                parameters.append(value)
+            else:
+                where.append(f"{COLUMNS[name]} = ?")
+                parameters.append(value)
+        if months is not None:
+            where.append(f"{COLUMNS['Month']} BETWEEN ? AND ?")
+            parameters += [int(months[0]), int(months[1])]
+        groups = ', '.join(str(number) for number in range(1, len(by) + 1))
+        sql = ' '.join([
+            f"SELECT {', '.join([COLUMNS[name] for name in by] + [SUMS[measure]])} FROM orders o",
+            *sorted(joins),
+            f"WHERE {' AND '.join(where)}" if where else '',
+            f"GROUP BY {groups}" if by else '',
+        ])
+        labelled = [level for level, name in enumerate(by) if name in LABELLED]
+        if largest is not None and not labelled:
+            sql += f" ORDER BY {len(by) + 1} DESC, 1 LIMIT {int(largest)}"
+        elif by:
+            sql += f" ORDER BY {groups}"
+        with self.pool.connection() as connection:
+            rows = connection.execute(sql, parameters).fetchall()
+        if labelled:
+            rows = relabel(rows, labelled)
+            if largest is not None:
+                rows = sorted(rows, key=lambda row: -row[-1])[:largest]
+        return rows
+
+    def total(self, measure='Total'):
+        """returns the grand total of a measure (money in NZD)"""
+        total = self.query(measure=measure)[0][0] or 0
+        if measure in MONEY_COLUMNS:
+            total = to_money(total)
+        return total
+
+    def rollup(self, *dimensions, measure='Total'):
+        """returns the measure summed over the given dimensions (money in NZD)"""
+        key = (dimensions, measure)
+        rollups = self.rollups
+        if key not in rollups:
+            rollups[key] = to_series(self.query(dimensions, measure=measure), dimensions, measure)
+        return rollups[key]
+
+    def slice(self, dimension, value, *by, measure='Total'):
+        """returns the measure of one dimension value, summed by other dimensions"""
+        return to_series(self.query(by, [(dimension, value)], measure), by, measure)
+
+    def years(self):
+        """returns the years found in the order data: the first and last date, then one
+        indexed lookup per year in between"""
+        rollups = self.rollups
+        if 'years' not in rollups:
+            with self.pool.connection() as connection:
+                first, last = connection.execute("SELECT MIN(date), MAX(date) FROM orders").fetchone()
+                years = []
+                if first is not None:
+                    for year in range(int(first[:4]), int(last[:4]) + 1):
+                        if connection.execute("SELECT 1 FROM orders WHERE date >= ? AND date < ? LIMIT 1",
+                                              (f"{year:04d}-01-01", f"{year + 1:04d}-01-01")).fetchone():
+                            years.append(year)
+            rollups['years'] = years
+        return rollups['years']
+
+    def monthly(self, dimension=None, value=None, measure='Total', year=None):
+        """returns the measure in each of the 12 months of a year (the latest year by default)"""
+        if year is None:
+            year = self.latest_year()
+        filters = [('Year', year)] + ([] if dimension is None else [(dimension, value)])
+        monthly_total = to_series(self.query(('Month',), filters, measure), ('Month',), measure)
+        return monthly_total.reindex(MONTHS, fill_value=0)
+
+    def between(self, start, end, dimension=None, value=None, measure='Total'):
+        """returns the measure in each month from start to end date, indexed by pd.Period.
+        The first and last month count only their days inside the range"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        periods = pd.period_range(start, end, freq='M')
+        filters = [] if dimension is None else [(dimension, value)]
+        rows = self.query(('Year', 'Month'), filters, measure,
+                          dates=(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        data = to_series(rows, ('Year', 'Month'), measure)
+        keys = pd.MultiIndex.from_arrays([periods.year, periods.month])
+        return pd.Series(data.reindex(keys, fill_value=0).to_numpy(), index=periods, name=measure)
+
+    def top(self, column, measure, k, filters=(), months=None):
+        """returns the k biggest sums of a measure by column, highest first, from one SQL query"""
+        if k <= 0:
+            return to_series([], (column,), measure)
+        return to_series(self.query((column,), filters, measure, months, largest=k), (column,), measure)
+
+    def totals(self, column, ids, measure='Total'):
+        """returns the measure of some IDs from indexed lookups, not a GROUP BY of every order"""
+        ids = list(ids)
+        rows = []
+        for start in range(0, len(ids), MAX_PARAMETERS):
+            rows += self.query((column,), [(column, ids[start:start + MAX_PARAMETERS])], measure)
+        return to_series(rows, (column,), measure).reindex(ids, fill_value=0)
+
+    def add_orders(self, new_orders, categories=None, provinces=None):
+        """inserts a batch of new orders (order schema) into the database"""
+        with self.lock:
+            with self.pool.connection() as connection:
+                with connection:
+                    connection.executemany(INSERT_ORDER, order_rows(new_orders))
+            self.rollups = {}
+            self.changed()
+
+    def close(self):
+        """closes the idle connections of the pool"""
+        self.pool.close()
+
+
+def relabel(rows, levels):
+    """returns query rows with the names at some levels written as labels, rows of the same
+    labels added together, sorted"""
+    sums = {}
+    for row in rows:
+        key = tuple(label(value) if level in levels else value for level, value in enumerate(row[:-1]))
+        sums[key] = sums.get(key, 0) + row[-1]
+    return [key + (value,) for key, value in sorted(sums.items())]
+
+
+def to_series(rows, by, measure):
+    """returns query rows (group values..., sum) as a series indexed by the group values, money in NZD"""
+    values = [row[-1] for row in rows]
+    if len(by) == 1:
+        index = pd.Index([row[0] for row in rows], name=by[0])
+    else:
+        index = pd.MultiIndex.from_arrays([[row[level] for row in rows] for level in range(len(by))],
+                                          names=list(by))
+    series = pd.Series(values, index=index, name=measure, dtype='int64' if measure in MONEY_COLUMNS else 'float64')
+    if measure in MONEY_COLUMNS:
+        series = to_money(series)
+    return series
+
+
+def order_rows(order_data):
+    """returns the rows of order data (order schema) as tuples for the orders table"""
+    return zip(order_data['ORDER ID'].astype('int64').tolist(),
+               order_data['Client ID'].astype(str).tolist(),
+               order_data['Product ID'].astype(str).tolist(),
+               order_data['Date'].dt.strftime('%Y-%m-%d').tolist(),
+               order_data['Price'].astype('int64').tolist(),
+               order_data['Quantity'].astype('float64').tolist(),
+               order_data['Total'].astype('int64').tolist())
+
+
+def text_rows(filename, columns):
+    """returns the first columns of a csv file as text tuples (phone numbers keep their leading 0)"""
+    table = pd.read_csv(filename, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    return list(table.iloc[:, :columns].itertuples(index=False, name=None))
+
+
+def signature_of(sources):
+    """returns the signature a database is built for, as text"""
+    return json.dumps([SCHEMA_VERSION, DATABASE_VERSION, file_signature(sources)])
+
+
+def import_csv(database, order_file='order_data.csv', client_file='client_data.csv',
+               product_file='product_data.csv', chunksize=CHUNK_SIZE):
+    """bulk loads the csv files into a new database file, returns the number of orders imported.
+    Orders are read and inserted chunk by chunk in one transaction, then indexed"""
+    building = database + '.building'
+    if os.path.exists(building):
+        os.remove(building)
+    connection = sqlite3.connect(building)
+    # nothing to protect while the file is being built
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    count = 0
+    with connection:
+        for statement in TABLES:
+            connection.execute(statement)
+        connection.executemany("INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?)", text_rows(client_file, 6))
+        connection.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?)",
+                               [row[:5] + (float(row[5]),) for row in text_rows(product_file, 6)])
+        for chunk in read_order_chunks(order_file, chunksize):
+            connection.executemany(INSERT_ORDER, order_rows(chunk))
+            count += len(chunk)
+        for statement in INDEXES:
+            connection.execute(statement)
+        connection.execute("INSERT INTO meta VALUES ('signature', ?)",
+                           (signature_of([order_file, client_file, product_file]),))
+        # rows up to this rowid come from the csv files, the later ones were appended
+        connection.execute("INSERT INTO meta VALUES ('imported', ?)", (str(count),))
+    connection.execute("ANALYZE")
+    connection.close()
+    os.replace(building, database)
+    return count
+
+
+def open_database(database=None, order_file='order_data.csv', client_file='client_data.csv',
+                  product_file='product_data.csv', chunksize=CHUNK_SIZE, pool_size=POOL_SIZE):
+    """returns the SQLite backend of the csv files, importing them first when the database is
+    missing or was built from other versions of the csv files.
+    database: file name, by default orders.sqlite in the cache folder next to the csv files"""
+    if database is None:
+        database = cache_path(order_file, DATABASE_FILE)
+    sources = [order_file, client_file, product_file]
+    if stored_signature(database) != signature_of(sources):
+        import_csv(database, order_file, client_file, product_file, chunksize)
+    else:
+        remove_appended(database)
+    return SQLiteBackend(database, pool_size)
+
+
+def remove_appended(database):
+    """deletes the orders appended to a database after its import (in an earlier session),
+    returns the number deleted"""
+    connection = sqlite3.connect(database)
+    try:
+        with connection:
+            imported = int(connection.execute("SELECT value FROM meta WHERE key = 'imported'").fetchone()[0])
+            return connection.execute("DELETE FROM orders WHERE rowid > ?", (imported,)).rowcount
+    finally:
+        connection.close()
+
+
+def stored_signature(database):
+    """returns the signature a database was built for, or None if it cannot be read"""
+    if not os.path.exists(database):
+        return None
+    try:
+        connection = sqlite3.connect(database)
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
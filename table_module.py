@@ -0,0 +1,102 @@
+"""
+This table_module.py contains Table class, a column-stored result table with cached sort orders,
+and the fast formatters that turn it into plain text (same look as PrettyTable) or csv.
+Tables are shown by the virtualized table view of guimodule.py and written by export.py.
+This module is imported to client_module.py, product_module.py, report_module.py and export.py.
+"""
+import csv
+
+
+class Table:
+    """define table class"""
+    def __init__(self, columns, rows=(), align=None, title=None):
+        """Creates a table from column names and rows; align maps a column to 'l', 'c' or 'r'"""
+        self.columns = list(columns)
+        self.data = [list(values) for values in zip(*rows)] if rows else [[] for _ in self.columns]
+        self.align = align or {}
+        self.title = title
+        # row order of each sorted column, computed on the first sort by that column
+        self.sort_orders = {}
+        self.order = range(len(self))
+        self.sorted_by = None
+        self.descending = False
+
+    @classmethod
+    def from_columns(cls, columns, align=None, title=None):
+        """creates a table from {column name: list of values}, without building rows first"""
+        table = cls(columns.keys(), align=align, title=title)
+        table.data = [list(values) for values in columns.values()]
+        table.order = range(len(table))
+        return table
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def __str__(self):
+        return format_text(self)
+
+    def column(self, name):
+        """returns the values of a column in the original row order"""
+        return self.data[self.columns.index(name)]
+
+    def row(self, position):
+        """returns the values of the row shown at a position of the current order"""
+        index = self.order[position]
+        return [values[index] for values in self.data]
+
+    def rows(self, start=0, stop=None):
+        """returns the rows shown from start to stop in the current order"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.row(position) for position in range(start, stop)]
+
+    def sort(self, name, descending=False):
+        """orders the rows by a column; the order is computed once per column and reused"""
+        if name not in self.sort_orders:
+            values = self.column(name)
+            try:
+                # one type in the column: compare the values directly
+                order = sorted(range(len(values)), key=values.__getitem__)
+            except TypeError:
+                order = sorted(range(len(values)), key=lambda index: sort_key(values[index]))
+            self.sort_orders[name] = order
+        order = self.sort_orders[name]
+        self.order = order[::-1] if descending else order
+        self.sorted_by = name
+        self.descending = descending
+        return self
+
+
+def sort_key(value):
+    """returns a key sorting numbers before text and numbers by value"""
+    if isinstance(value, (int, float)):
+        return (0, value, '')
+    return (1, 0, str(value))
+
+
+def format_text(table, limit=None):
+    """returns the table as bordered plain text (like PrettyTable), at most limit rows"""
+    rows = table.rows(0, limit)
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [len(name) for name in table.columns]
+    for row in cells:
+        widths = [max(width, len(cell)) for width, cell in zip(widths, row)]
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    aligners = [{'l': str.ljust, 'r': str.rjust}.get(table.align.get(name), str.center) for name in table.columns]
+    lines = [border,
+             '| ' + ' | '.join(name.center(width) for name, width in zip(table.columns, widths)) + ' |',
+             border]
+    for row in cells:
+        lines.append('| ' + ' | '.join(aligner(cell, width)
+                                       for aligner, cell, width in zip(aligners, row, widths)) + ' |')
+    lines.append(border)
+    if limit is not None and len(table) > limit:
+        lines.append(f"... {len(table) - limit} more rows")
+    return '\n'.join(lines)
+
+
+def write_csv(table, filename):
+    """writes the table (in its current order) to a csv file"""
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(table.columns)
+        writer.writerows(table.rows())
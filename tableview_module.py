@@ -0,0 +1,92 @@
+"""
+This tableview_module.py contains VirtualTable class, a ttk.Treeview showing a Table of any length.
+Only the rows that fit in the view exist as Treeview items: scrolling rewrites their values from
+the table instead of creating one item per row. Clicking a column heading sorts by that column
+(clicking again reverses the order) using the cached sort orders of the table.
+This module is imported to guimodule.py.
+"""
+from tkinter.ttk import Treeview, Scrollbar
+
+
+class VirtualTable:
+    """define virtual table class"""
+    def __init__(self, master, height=20):
+        """Creates the Treeview (height visible rows) and its scrollbar inside master"""
+        self.height = height
+        self.table = None
+        # position (in the table order) of the first visible row
+        self.offset = 0
+        self.tree = Treeview(master, show='headings', height=height, selectmode='browse')
+        self.scrollbar = Scrollbar(master, orient='vertical', command=self.scroll)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind('<Up>', lambda event: self.move(-1))
+        self.tree.bind('<Down>', lambda event: self.move(1))
+        self.tree.bind('<Prior>', lambda event: self.move(-self.height))
+        self.tree.bind('<Next>', lambda event: self.move(self.height))
+
+    def grid(self, **options):
+        """places the table and its scrollbar with the grid manager"""
+        row, column = options.pop('row', 0), options.pop('column', 0)
+        self.tree.grid(row=row, column=column, sticky='nsew', **options)
+        self.scrollbar.grid(row=row, column=column + 1, sticky='ns')
+
+    def show(self, table):
+        """shows a new table from its first row"""
+        self.table = table
+        self.offset = 0
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(columns=table.columns)
+        for name in table.columns:
+            anchor = {'l': 'w', 'r': 'e'}.get(table.align.get(name), 'center')
+            self.tree.heading(name, text=self.heading_text(name), command=lambda name=name: self.sort(name))
+            self.tree.column(name, anchor=anchor, width=max(80, 9 * len(name)), stretch=True)
+        for _ in range(min(self.height, len(table))):
+            self.tree.insert('', 'end', values=())
+        self.refresh()
+
+    def heading_text(self, name):
+        """returns a heading with an arrow on the sorted column"""
+        if self.table is None or self.table.sorted_by != name:
+            return name
+        return f"{name} {'v' if self.table.descending else '^'}"
+
+    def sort(self, name):
+        """sorts by a column, reversing the order when it is already sorted by that column"""
+        descending = self.table.sorted_by == name and not self.table.descending
+        self.table.sort(name, descending)
+        for column in self.table.columns:
+            self.tree.heading(column, text=self.heading_text(column))
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """writes the visible rows into the Treeview items and moves the scrollbar"""
+        rows = self.table.rows(self.offset, self.offset + self.height)
+        for item, values in zip(self.tree.get_children(), rows):
+            self.tree.item(item, values=values)
+        total = max(len(self.table), 1)
+        self.scrollbar.set(self.offset / total, min(self.offset + self.height, total) / total)
+
+    def move(self, rows):
+        """scrolls by a number of rows"""
+        if self.table is None:
+            return 'break'
+        self.offset = max(0, min(self.offset + rows, len(self.table) - self.height))
+        self.refresh()
+        return 'break'
+
+    def scroll(self, action, amount, unit=None):
+        """handles the scrollbar: dragging ('moveto') or clicking arrows/trough ('scroll')"""
+        if self.table is None:
+            return
+        if action == 'moveto':
+            self.move(int(float(amount) * len(self.table)) - self.offset)
+        else:
+            self.move(int(amount) * (self.height if unit == 'pages' else 1))
+
+    def on_wheel(self, event):
+        """scrolls three rows per mouse wheel step"""
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            return self.move(-3)
+        return self.move(3)
@@ -0,0 +1,80 @@
+"""
+This timestore_module.py contains TimePartitionedStore class, which keeps the order data sorted by
+date and split into one partition per year-month, with the first/last order date of each partition.
+A date range query only reads the partitions it touches.
+This module is imported to report_module.py.
+"""
+import numpy as np
+import pandas as pd
+from schema_module import MONEY_COLUMNS, to_money
+
+
+class TimePartitionedStore:
+    """define time partitioned store class"""
+    def __init__(self, order_data):
+        """Sorts order data by date once and records the row range of every year-month"""
+        self.orders = order_data.sort_values('Date', kind='stable')
+        # partition (pd.Period) -> (start, stop) rows in the sorted orders
+        self.ranges = {}
+        # partition -> orders appended later
+        self.extra_orders = {}
+        # partition -> (first date, last date, number of orders)
+        self.metadata = {}
+        dates = self.orders['Date']
+        keys = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        stops = np.append(starts[1:], len(keys))
+        date_values = dates.to_numpy()
+        for start, stop in zip(starts, stops):
+            year, month = divmod(int(keys[start]), 12)
+            period = pd.Period(year=year, month=month + 1, freq='M')
+            self.ranges[period] = (int(start), int(stop))
+            self.metadata[period] = (pd.Timestamp(date_values[start]), pd.Timestamp(date_values[stop - 1]),
+                                     int(stop - start))
+
+    def append(self, new_orders):
+        """adds new orders to the partitions of their months"""
+        periods = new_orders['Date'].dt.to_period('M')
+        for period, rows in new_orders.groupby(periods, observed=True):
+            rows = rows.sort_values('Date', kind='stable')
+            self.extra_orders.setdefault(period, []).append(rows)
+            first, last, count = self.metadata.get(period, (rows['Date'].iloc[0], rows['Date'].iloc[-1], 0))
+            self.metadata[period] = (min(first, rows['Date'].iloc[0]), max(last, rows['Date'].iloc[-1]),
+                                     count + len(rows))
+
+    def partitions_between(self, start, end):
+        """returns the year-months whose orders overlap the dates from start to end"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return [period for period, (first, last, count) in sorted(self.metadata.items())
+                if last >= start and first <= end]
+
+    def partition(self, period):
+        """returns all orders of one year-month"""
+        start, stop = self.ranges.get(period, (0, 0))
+        rows = self.orders.iloc[start:stop]
+        if period in self.extra_orders:
+            rows = pd.concat([rows] + self.extra_orders[period])
+        return rows
+
+    def orders_between(self, start, end, dimension=None, value=None):
+        """returns the orders from start to end date (both included), optionally of one client/product"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        selected = []
+        for period in self.partitions_between(start, end):
+            rows = self.partition(period)
+            first, last, count = self.metadata[period]
+            if first < start or last > end:
+                rows = rows[(rows['Date'] >= start) & (rows['Date'] <= end)]
+            if dimension is not None:
+                rows = rows[rows[dimension] == value]
+            selected.append(rows)
+        if not selected:
+            return self.orders.iloc[0:0]
+        return pd.concat(selected)
+
+    def total(self, start, end, dimension=None, value=None, measure='Total'):
+        """returns the measure summed over the orders from start to end date (money in NZD)"""
+        total = self.orders_between(start, end, dimension, value)[measure].sum()
+        if measure in MONEY_COLUMNS:
+            total = to_money(total)
+        return total
@@ -0,0 +1,40 @@
+"""
+This topk_module.py contains top_k function, the one top-K engine behind every "top N" chart.
+It turns the request into a column, a measure and filters, and asks the order backend for the
+K biggest sums: the aggregate cube reads precomputed group sums and selects them with a partial
+selection (numpy argpartition, select_largest) instead of sorting every group, the SQLite backend
+runs one indexed GROUP BY ... LIMIT query.
+This module is imported to client_module.py, product_module.py, report_module.py, cube_module.py
+and forecast_module.py.
+"""
+import numpy as np
+
+DIMENSIONS = {'client': 'Client ID', 'product': 'Product ID', 'category': 'Category', 'province': 'Province'}
+METRICS = {'revenue': 'Total', 'quantity': 'Quantity'}
+
+
+def top_k(backend, dimension, metric='revenue', k=10, months=None, province=None, client=None, product=None,
+          year=None):
+    """returns the k biggest values of a dimension (client/product/category/province) for a metric
+    (revenue/quantity), highest first.
+    months: (first, last) month range; year, province, client, product: only orders matching that value
+    (a filter on the ranked dimension itself is ignored)"""
+    column = DIMENSIONS[dimension]
+    measure = METRICS[metric]
+    filters = [(name, value) for name, value in [('Year', year), ('Province', province),
+                                                 ('Client ID', client), ('Product ID', product)]
+               if value is not None and name != column]
+    return backend.top(column, measure, k, filters, months)
+
+
+def select_largest(sums, k):
+    """returns the k largest entries of a series, highest first, without sorting the whole series"""
+    values = sums.to_numpy()
+    if k <= 0:
+        return sums.iloc[0:0]
+    if k < len(values):
+        chosen = np.argpartition(-values, k - 1)[:k]
+    else:
+        chosen = np.arange(len(values))
+    chosen = chosen[np.argsort(-values[chosen], kind='stable')]
+    return sums.iloc[chosen]
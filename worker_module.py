@@ -0,0 +1,77 @@
+"""
+This worker_module.py contains BackgroundRunner class, which runs report calculations on a thread pool
+so the tkinter window never freezes, and hands the results back to the tkinter thread.
+This module is imported to guimodule.py.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrument_module import INSTRUMENTS
+
+POLL_MS = 30
+
+
+class BackgroundRunner:
+    """define background runner class"""
+    def __init__(self, window, on_busy=None, max_workers=4):
+        """Creates a thread pool for the window; on_busy(count) is called when the number of jobs changes"""
+        self.window = window
+        self.on_busy = on_busy
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        # latest job number and future of each channel, older jobs of a channel are stale
+        self.latest = {}
+        self.futures = {}
+        self.running = 0
+
+    def submit(self, channel, work, done, failed=None):
+        """runs work() in the pool, then done(result) on the tkinter thread.
+        A new job on the same channel cancels the one before it, jobs on other channels run together"""
+        with self.lock:
+            number = self.latest.get(channel, 0) + 1
+            self.latest[channel] = number
+            previous = self.futures.get(channel)
+            if previous is not None and previous.cancel():
+                self.running -= 1
+            future = self.executor.submit(work)
+            self.futures[channel] = future
+            self.running += 1
+        self.report_busy()
+        self.window.after(POLL_MS, self.poll, channel, number, future, done, failed, time.perf_counter())
+        return number
+
+    def poll(self, channel, number, future, done, failed, started):
+        """checks a job from the tkinter thread and hands over its result once it is finished.
+        The time from submit until done/failed returns is recorded as 'job.<channel>'"""
+        if future.cancelled():
+            return
+        if not future.done():
+            self.window.after(POLL_MS, self.poll, channel, number, future, done, failed, started)
+            return
+        with self.lock:
+            self.running -= 1
+            stale = self.latest.get(channel) != number
+            if not stale:
+                del self.futures[channel]
+        self.report_busy()
+        if stale:
+            return
+        error = future.exception()
+        try:
+            if error is None:
+                done(future.result())
+            elif failed is not None:
+                failed(error)
+            else:
+                raise error
+        finally:
+            INSTRUMENTS.record(f"job.{channel}", time.perf_counter() - started, failed=error is not None)
+
+    def report_busy(self):
+        """tells the window how many jobs are still running"""
+        if self.on_busy is not None:
+            self.on_busy(self.running)
+
+    def shutdown(self):
+        """cancels waiting jobs and stops the pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)